@@ -3,24 +3,34 @@ import json
 import logging
 import os
 import random
+import re
 import textwrap
 import time
+import zlib
+from array import array
+from collections import OrderedDict
 from datetime import datetime
+from functools import lru_cache
 from io import BytesIO
-from typing import Dict, List, Optional, Tuple, Union
+from typing import Dict, Generic, Iterable, List, Optional, Sequence, Set, Tuple, TypeVar, Union
 
 import discord
+import numpy as np
 import yaml
 from discord import app_commands
-from discord.ext import commands
+from discord.ext import commands, tasks
 from PIL import Image, ImageDraw, ImageFont
-from tabulate import tabulate
 
-from common.dataio import get_package_path, get_sqlite_database
+from common.dataio import get_data_file_path, get_package_path, get_sqlite_database
+from common.sessions import SessionRegistry
 from common.utils import pretty
+from common.utils.clock import Clock
+from common.utils.ratelimit import GameBoard, SendBudget
 
 logger = logging.getLogger(f'ctrlalt.{__name__}')
 
+T = TypeVar('T')
+
 CPU_NAMES = [
     "Sy Philis",
     "Doug Dick",
@@ -58,11 +68,23 @@ END_CARD_TEXT = [
 ]
 
 MAX_PLAYERS = 8
+MAX_PLAYERS_LARGE = 500
+VOTE_PAGE_SIZE = 25 # Limite d'options d'un menu de sélection Discord
+LOBBY_REFRESH_INTERVAL = 5 # secondes
+BOARD_REFRESH_INTERVAL = 3 # secondes, délai minimal entre deux mises à jour de la progression d'un round
+SESSION_RESUME_DELAY = 3600 # Au delà, une partie interrompue n'est plus reprise
 MINIMAL_HUMAN_PLAYERS = 2
 FILL_PLAYERS_UNTIL = 4
 HAND_SIZE = 6
 WINNER_POINTS = 3
 VOTED_POINTS = 1
+PACKS_RELOAD_INTERVAL = 30 # secondes
+AVATAR_SIZE = 512 # Taille demandée à Discord (puissance de 2), réduite à 440px sur la carte de fin
+AVATAR_CACHE_SIZE = 64
+CPU_FEATURES = 1024 # Taille des vecteurs de caractéristiques des cartes noires
+CPU_VOTE_TEMPERATURE = 0.25 # Plus elle est basse, plus les CPU votent pour la proposition qu'ils jugent la meilleure
+TOKEN_PATTERN = re.compile(r"\w{3,}")
+YAML_LOADER = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
 TIMEOUTS = {
     'register': 60,
     'choose_cards': 60,
@@ -71,6 +93,15 @@ TIMEOUTS = {
     'vote_round': 60,
     'export_black_cards': 30
 }
+PACING_PROFILES = { # Multiplicateurs des pauses entre les phases et des temps de réponse accordés aux joueurs
+    'classic': {'delays': 1.0, 'timeouts': 1.0, 'skip_when_done': False},
+    'fast': {'delays': 0.5, 'timeouts': 0.66, 'skip_when_done': False},
+    'tournament': {'delays': 0.75, 'timeouts': 1.5, 'skip_when_done': False},
+    'turbo': {'delays': 0.5, 'timeouts': 0.66, 'skip_when_done': True} # Pas de pause une fois que tous les joueurs ont agi
+}
+DEFAULT_SETTINGS = [
+    ('pacing', 'classic')
+]
 
 # Vues Discord ----------------------------------------------------------------
 
@@ -100,19 +131,19 @@ class ChoosePacksSelect(discord.ui.Select):
 # Enregistrement des joueurs
 class RegisterPlayersView(discord.ui.View):
     def __init__(self, game: 'ClassicGame') -> None:
-        super().__init__(timeout=TIMEOUTS['register'])
+        super().__init__(timeout=game.timeout('register'))
         self.game = game
         self.message : discord.Message = None #type: ignore
+        self._refresh_task : Optional[asyncio.Task] = None
         
     async def interaction_check(self, interaction: discord.Interaction) -> bool:
-        selfplayer = HumanPlayer(interaction.user)
-        if selfplayer not in self.game.players:
+        if self.game.get_player_by_id(interaction.user.id) is None:
             return True
         await interaction.response.send_message("**Erreur ·** Vous êtes déjà inscrit à la partie", ephemeral=True, delete_after=10)
         return False
     
     def get_embed(self, starting: bool = False) -> discord.Embed:
-        desc = f"**{self.game.author.name}** vous invite à jouer à Anarchy !\nRejoignez la partie en cliquant sur le bouton ci-dessous ({TIMEOUTS['register']}s)"
+        desc = f"**{self.game.author.name}** vous invite à jouer à Anarchy !\nRejoignez la partie en cliquant sur le bouton ci-dessous ({self.game.timeout('register'):.0f}s)"
         if starting:
             desc = f"**Inscriptions terminées**\nLa partie va bientôt commencer !"
         embed = discord.Embed(
@@ -122,33 +153,50 @@ class RegisterPlayersView(discord.ui.View):
         )
         embed.add_field(name="Extensions utilisées", value='\n'.join([f'• **{pack.name}** `[{len(pack.black_cards)}B|{len(pack.white_cards)}W]`' for pack in self.game.packs]))
         embed.add_field(name="Nombre de rounds", value=f"**{self.game.rounds}** (Env. {int(self.game.rounds * 2)} min.)")
-        embed.add_field(name=f"Joueurs inscrits ({len(self.game.players)}/{MAX_PLAYERS})", value='\n'.join([f'• **{player}**' for player in self.game.players]), inline=False)
+        players_txt = '\n'.join([f'• **{player}**' for player in self.game.players[:20]])
+        if len(self.game.players) > 20:
+            players_txt += f'\n*... et {len(self.game.players) - 20} autres*'
+        embed.add_field(name=f"Joueurs inscrits ({len(self.game.players)}/{self.game.max_players})", value=players_txt, inline=False)
         return embed
     
     async def start(self) -> None:
         embed = self.get_embed()
-        self.message = await self.game.channel.send(embed=embed, view=self)
+        self.message = await self.game.send(embed=embed, view=self)
+        
+    async def refresh(self) -> None:
+        """Met à jour la liste des inscrits (regroupe les mises à jour en grand lobby)"""
+        if not self.game.large:
+            await self.game.edit(self.message, embed=self.get_embed())
+        elif not self._refresh_task or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self.__delayed_refresh())
+            
+    async def __delayed_refresh(self) -> None:
+        await self.game.clock.sleep(LOBBY_REFRESH_INTERVAL)
+        if not self.is_finished():
+            await self.game.edit(self.message, embed=self.get_embed())
         
     async def on_timeout(self) -> None:
         if len(self.game.players) < MINIMAL_HUMAN_PLAYERS:
-            await self.message.edit(view=None)
+            await self.game.edit(self.message, view=None)
         elif len(self.game.players) < FILL_PLAYERS_UNTIL:
             self.game.fill_players()
             embed = self.get_embed(starting=True)
             embed.set_footer(text=f"🤖 Des IA ont été ajoutées à la partie pour atteindre {FILL_PLAYERS_UNTIL} joueurs\nLa partie sera enregistrée dans le but d'améliorer les CPU")
-            await self.message.edit(embed=embed, view=None)
+            await self.game.edit(self.message, embed=embed, view=None)
+        else:
+            await self.game.edit(self.message, embed=self.get_embed(starting=True), view=None)
         self.stop()
         
     @discord.ui.button(label="Rejoindre la partie", style=discord.ButtonStyle.blurple)
     async def join(self, interaction: discord.Interaction, button: discord.ui.Button) -> None:
         """Rejoindre la partie"""
-        if len(self.game.players) >= MAX_PLAYERS:
+        if len(self.game.players) >= self.game.max_players:
             await interaction.response.send_message("**Erreur ·** La partie est déjà pleine", ephemeral=True)
             return
         player = HumanPlayer(interaction.user)
         self.game.add_player(player)
-        await self.message.edit(embed=self.get_embed())
-        await interaction.response.send_message(f"**Anarchy ·** Vous avez rejoint la partie", ephemeral=True, delete_after=20)
+        await interaction.response.send_message(f"**Anarchy ·** Vous avez rejoint la partie", ephemeral=True, delete_after=self.game.ephemeral_delay(20))
+        await self.refresh()
         
 # Choix des cartes à jouer
 class ChooseCardsView(discord.ui.View):
@@ -170,17 +218,23 @@ class ChooseCardsView(discord.ui.View):
             return False
         return True
 
+    def get_content(self, status: str = '') -> str:
+        header = f"**~~            ~~ Round {self.game.round} ~~            ~~**\nVos cartes blanches ont été distribuées.\n\n"
+        return header + "**Voici la carte noire de ce round ·** Cliquez sur le bouton ci-dessous pour proposer vos cartes.\n" + (status or "_ _")
+
     async def start(self) -> None:
-        image = self.game.round_black_card.image
-        self.message = await self.game.channel.send(content="**Voici la carte noire de ce round ·** Cliquez sur le bouton ci-dessous pour proposer vos cartes.\n_ _", file=image, view=self)
+        if self.game.headless:
+            self.message = await self.game.board.post(content=self.get_content(), view=self)
+        else:
+            self.message = await self.game.board.post(content=self.get_content(), file=self.game.round_black_card.image, view=self)
         
-    @discord.ui.button(label='Proposer ses cartes', emoji='<:iconCards:1078392002086969344>', style=discord.ButtonStyle.green)
+    @discord.ui.button(label='Proposer ses cartes', emoji='<:iconCards:1078392002086969344>', style=discord.ButtonStyle.green, custom_id='anarchy:play_round')
     async def play_round(self, interaction: discord.Interaction, button: discord.ui.Button) -> None:
         """Jouer le round"""
         player = self.game.get_player_by_id(interaction.user.id)
-        if not player:
+        if player is None:
             return
-        view = discord.ui.View(timeout=TIMEOUTS['choose_cards'])
+        view = discord.ui.View(timeout=self.game.timeout('choose_cards'))
         select = ChooseWhiteCardsSelect(self.game, player, self.game.round_black_card.blanks)
         view.add_item(select)
         player.status = 'choosing'
@@ -208,7 +262,7 @@ class ChooseWhiteCardsSelect(discord.ui.Select):
     
     async def callback(self, interaction: discord.Interaction) -> None:
         if self.game.status != 'choose_cards':
-            return await interaction.response.send_message("**Erreur ·** Vous ne pouvez plus jouer de cartes pour le moment", ephemeral=True, delete_after=10)
+            return await interaction.response.send_message("**Erreur ·** Vous ne pouvez plus jouer de cartes pour le moment", ephemeral=True, delete_after=self.game.ephemeral_delay(10))
         edited = False
         if self.player.played_cards:
             self.player.cancel_play()
@@ -216,60 +270,117 @@ class ChooseWhiteCardsSelect(discord.ui.Select):
         self.player.play(self.values)
         bc_demo = self.game.round_black_card.fill(self.values, with_codeblock=True)
         if edited:
-            await interaction.response.send_message(f"**Carte(s) modifiée(s) ·** Vous avez joué {' '.join((f'`{value}`' for value in self.values))}.\n\n✱ **{bc_demo}**", ephemeral=True, delete_after=20)
+            await interaction.response.send_message(f"**Carte(s) modifiée(s) ·** Vous avez joué {' '.join((f'`{value}`' for value in self.values))}.\n\n✱ **{bc_demo}**", ephemeral=True, delete_after=self.game.ephemeral_delay(20))
         else:
-            await interaction.response.send_message(f"**Carte(s) jouée(s) ·** Vous avez joué {' '.join((f'`{value}`' for value in self.values))}.\n\n✱ **{bc_demo}**", ephemeral=True, delete_after=20)
+            await interaction.response.send_message(f"**Carte(s) jouée(s) ·** Vous avez joué {' '.join((f'`{value}`' for value in self.values))}.\n\n✱ **{bc_demo}**", ephemeral=True, delete_after=self.game.ephemeral_delay(20))
         
 # Vote pour la meilleure carte
 class VoteBestCardsSelect(discord.ui.Select):
-    def __init__(self, game: 'ClassicGame') -> None:
+    def __init__(self, game: 'ClassicGame', page: int = 0) -> None:
         super().__init__(
             placeholder=f"Sélectionnez votre proposition favorite",
             min_values=1,
             max_values=1,
-            row=0
+            row=0,
+            custom_id=f'anarchy:vote:{page}'
         )
         self.game = game
+        self.page = page
         self.__fill_options()
         
     def __fill_options(self) -> None:
         black_card = self.game.round_black_card
-        for player_id, cards in self.game.round_white_cards.items():
-            self.add_option(label=" | ".join(cards), value=player_id, description=pretty.troncate_text(black_card.fill(cards), 100))
+        proposals = list(self.game.round_white_cards.items())[self.page * VOTE_PAGE_SIZE:(self.page + 1) * VOTE_PAGE_SIZE]
+        for player_id, cards in proposals:
+            self.add_option(label=pretty.troncate_text(" | ".join(cards), 100), value=player_id, description=pretty.troncate_text(black_card.fill(cards), 100))
     
     async def callback(self, interaction: discord.Interaction) -> None:
         selfplayer = self.game.get_player_by_id(interaction.user.id)
-        if not selfplayer:
+        if selfplayer is None:
             return await interaction.response.send_message("**Erreur ·** Vous ne jouez pas à la partie en cours", ephemeral=True, delete_after=10)
         if self.game.status != 'vote_round':
-            return await interaction.response.send_message("**Erreur ·** Vous ne pouvez plus voter pour le moment", ephemeral=True, delete_after=10)
-        edited = False
-        if selfplayer in [player for pid in self.game.votes for player in self.game.votes[pid]]:
-            edited = True
-            self.game.clear_player_vote(selfplayer)
+            return await interaction.response.send_message("**Erreur ·** Vous ne pouvez plus voter pour le moment", ephemeral=True, delete_after=self.game.ephemeral_delay(10))
+        previous_vote = self.game.voters.get(selfplayer)
         if not self.game.add_vote(selfplayer, self.values[0]):
-            return await interaction.response.send_message(f"**Erreur ·** Vous ne pouvez pas voter pour votre propre proposition.", ephemeral=True, delete_after=10)
+            return await interaction.response.send_message(f"**Erreur ·** Vous ne pouvez pas voter pour votre propre proposition.", ephemeral=True, delete_after=self.game.ephemeral_delay(10))
         
+        if previous_vote:
+            for c in self.game.round_white_cards[previous_vote]:
+                self.game.white_cards_human[c] -= 1
         cards = self.game.round_white_cards[self.values[0]]
         for c in cards:
             self.game.white_cards_human[c] = self.game.white_cards_human.get(c, 0) + 1
             
-        if edited:
-            await interaction.response.send_message(f"**Vote modifié ·** Vous avez voté pour {' | '.join(f'`{c}`' for c in cards)}.", ephemeral=True, delete_after=20)
+        if previous_vote:
+            await interaction.response.send_message(f"**Vote modifié ·** Vous avez voté pour {' | '.join(f'`{c}`' for c in cards)}.", ephemeral=True, delete_after=self.game.ephemeral_delay(20))
         else:
-            await interaction.response.send_message(f"**Vote enregistré ·** Vous avez voté pour {' | '.join(f'`{c}`' for c in cards)}.", ephemeral=True, delete_after=20)
+            await interaction.response.send_message(f"**Vote enregistré ·** Vous avez voté pour {' | '.join(f'`{c}`' for c in cards)}.", ephemeral=True, delete_after=self.game.ephemeral_delay(20))
+
+# Vote paginé pour les grands lobbys
+class VoteBestCardsPagesView(discord.ui.View):
+    def __init__(self, game: 'ClassicGame') -> None:
+        super().__init__(timeout=game.timeout('vote_round'))
+        self.game = game
+        self.page = 0
+        self.pages = max(1, -(-len(game.round_white_cards) // VOTE_PAGE_SIZE))
+        self.select : VoteBestCardsSelect = None #type: ignore
+        self.__update_items()
+        
+    def __update_items(self) -> None:
+        if self.select:
+            self.remove_item(self.select)
+        self.select = VoteBestCardsSelect(self.game, self.page)
+        self.add_item(self.select)
+        self.previous.disabled = self.page == 0
+        self.next.disabled = self.page + 1 >= self.pages
+        
+    @property
+    def content(self) -> str:
+        return f"**Anarchy ·** Votez pour votre proposition favorite (page {self.page + 1}/{self.pages})"
+        
+    @discord.ui.button(label="Précédent", style=discord.ButtonStyle.secondary, row=1)
+    async def previous(self, interaction: discord.Interaction, button: discord.ui.Button) -> None:
+        self.page = max(0, self.page - 1)
+        self.__update_items()
+        await interaction.response.edit_message(content=self.content, view=self)
+        
+    @discord.ui.button(label="Suivant", style=discord.ButtonStyle.secondary, row=1)
+    async def next(self, interaction: discord.Interaction, button: discord.ui.Button) -> None:
+        self.page = min(self.pages - 1, self.page + 1)
+        self.__update_items()
+        await interaction.response.edit_message(content=self.content, view=self)
+        
+class OpenVoteView(discord.ui.View):
+    def __init__(self, game: 'ClassicGame') -> None:
+        super().__init__(timeout=None)
+        self.game = game
+        
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        if self.game.get_player_by_id(interaction.user.id) is None:
+            await interaction.response.send_message("**Erreur ·** Vous ne jouez pas à la partie en cours", ephemeral=True, delete_after=10)
+            return False
+        return True
+        
+    @discord.ui.button(label='Voter', style=discord.ButtonStyle.green, custom_id='anarchy:open_vote')
+    async def vote(self, interaction: discord.Interaction, button: discord.ui.Button) -> None:
+        """Ouvrir le menu de vote"""
+        view = VoteBestCardsPagesView(self.game)
+        await interaction.response.send_message(view.content, view=view, ephemeral=True)
 
 # Boutons d'export des cartes noires complétées
 class ExportBlackCardsView(discord.ui.View):
     def __init__(self, game: 'ClassicGame') -> None:
-        super().__init__(timeout=TIMEOUTS['export_black_cards'])
+        super().__init__(timeout=game.timeout('export_black_cards'))
         self.game = game
-        self.files = self.__get_files()
+        self.round = game.round
+        self.black_card = game.round_black_card
+        self.winners = [(game.round_white_cards[str(player.id)], player) for player in game.get_winners()][:10] # Limite de fichiers par message
         self.receivers = []
         
     def __get_files(self) -> List[discord.File]:
-        black_card = self.game.round_black_card
-        winners = [(self.game.round_white_cards[str(player.id)], player) for player in self.game.get_winners()]
+        """Génère les images à la demande, la plupart des rounds n'étant jamais exportés"""
+        black_card = self.black_card
+        winners = self.winners
         files = []
         for winner_text, player in winners:
             file = black_card.fill_image(winner_text, footer=f"@{str(player)}")
@@ -279,9 +390,11 @@ class ExportBlackCardsView(discord.ui.View):
     @discord.ui.button(label='Exporter les cartes noires', style=discord.ButtonStyle.gray)
     async def export_black_cards(self, interaction: discord.Interaction, button: discord.ui.Button) -> None:
         """Obtenir les cartes noires complétées"""
-        await interaction.response.send_message(f"**Exportation des cartes noires (Round {self.game.round}) ·** Voici les cartes noires complétées avec les propositions des gagnants.", 
-                                                files=self.files, 
-                                                ephemeral=True)
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        files = await asyncio.to_thread(self.__get_files)
+        await interaction.followup.send(f"**Exportation des cartes noires (Round {self.round}) ·** Voici les cartes noires complétées avec les propositions des gagnants.", 
+                                        files=files, 
+                                        ephemeral=True)
         self.receivers.append(interaction.user.id)
         
     async def interaction_check(self, interaction: discord.Interaction) -> bool:
@@ -297,6 +410,21 @@ class ExportBlackCardsView(discord.ui.View):
             
 # Classes de jeu ---------------------------------------------------------------
 
+@lru_cache(maxsize=4096)
+def card_features(text: str) -> Tuple[np.ndarray, np.ndarray]:
+    """Vecteur creux (indices, valeurs) décrivant une carte noire par hachage de ses mots
+
+    La carte elle-même est une caractéristique à part entière, ce qui conserve les associations exactes apprises, tandis que les mots permettent de généraliser aux cartes jamais vues.
+    Une caractéristique commune à toutes les cartes capte la popularité générale des cartes blanches.
+    """
+    tokens = sorted(set(TOKEN_PATTERN.findall(text.lower())))
+    keys = [f'#{text}', '#'] + tokens
+    indices = np.array([zlib.crc32(key.encode()) % CPU_FEATURES for key in keys], dtype=np.intp)
+    values = np.full(len(keys), 1 / np.sqrt(max(len(tokens), 1)), dtype=np.float32)
+    values[:2] = (1.0, 0.1)
+    return indices, values
+
+
 class CPUTraining:
     def __init__(self, cog: 'Anarchy') -> None:
         self._cog = cog
@@ -305,8 +433,125 @@ class CPUTraining:
     def register_round(self, black_card: 'BlackCard', white_cards: Dict[str, int]) -> None:
         self.data[black_card.text] = white_cards
     
-    def save(self) -> None:
-        self._cog.update_training_data(self.data)
+    async def save(self) -> None:
+        await self._cog.brain.learn(self.data)
+
+
+class CPUBrain:
+    """Modèle d'entraînement partagé par tous les CPU du module
+    
+    Les scores sont gardés en base de données (textes internés sous forme d'identifiants entiers).
+    En mémoire, chaque carte blanche entraînée est une ligne d'une matrice de poids indexée par les caractéristiques des cartes noires (voir `card_features()`), ce qui permet de noter toute une main en une seule opération."""
+    def __init__(self, cog: 'Anarchy') -> None:
+        self._cog = cog
+        self._ids : Optional[Dict[str, int]] = None
+        self._rows : Optional[Dict[str, int]] = None
+        self._weights = np.zeros((0, CPU_FEATURES), dtype=np.float32)
+        self._rng = np.random.default_rng()
+        self._learning = asyncio.Lock()
+        
+    @property
+    def card_ids(self) -> Dict[str, int]:
+        """Table d'internement texte -> identifiant, chargée à la première utilisation"""
+        if self._ids is None:
+            self._ids = self._cog.get_interned_cards()
+        return self._ids
+    
+    def intern(self, texts: Iterable[str]) -> Dict[str, int]:
+        """Renvoie les identifiants des cartes données en internant celles qui sont encore inconnues"""
+        texts = set(texts)
+        missing = [text for text in texts if text not in self.card_ids]
+        if missing:
+            self.card_ids.update(self._cog.intern_cards(missing))
+        return {text: self.card_ids[text] for text in texts}
+    
+    @property
+    def white_rows(self) -> Dict[str, int]:
+        """Lignes de la matrice de poids par carte blanche (le modèle est construit ici s'il n'a pas été chargé avec `load()`)"""
+        if self._rows is None:
+            self._rows, self._weights = self.__build()
+        return self._rows
+    
+    async def load(self) -> None:
+        """Construit le modèle à partir des données d'entraînement hors de la boucle d'événements, avant le début des parties"""
+        if self._rows is None:
+            rows, weights = await asyncio.to_thread(self.__build)
+            if self._rows is None:
+                self._rows, self._weights = rows, weights
+    
+    def __build(self) -> Tuple[Dict[str, int], np.ndarray]:
+        return self.__fit({}, np.zeros((0, CPU_FEATURES), dtype=np.float32), self._cog.get_training_data())
+    
+    @staticmethod
+    def __fit(rows: Dict[str, int], weights: np.ndarray, data: Dict[str, Dict[str, int]]) -> Tuple[Dict[str, int], np.ndarray]:
+        """Ajoute les scores donnés à la matrice de poids et renvoie les lignes des nouvelles cartes blanches avec la matrice
+        
+        `rows` n'est pas modifié, ce qui permet d'entraîner le modèle dans un thread pendant que les parties le consultent.
+        La matrice n'est recopiée que lorsqu'elle est pleine, sa capacité augmentant alors de moitié."""
+        added : Dict[str, int] = {}
+        for white_cards in data.values():
+            for white_card in white_cards:
+                if white_card not in rows and white_card not in added:
+                    added[white_card] = len(rows) + len(added)
+        size = len(rows) + len(added)
+        if size > len(weights):
+            grown = np.zeros((max(size, len(weights) * 3 // 2, 64), CPU_FEATURES), dtype=np.float32)
+            grown[:len(weights)] = weights
+            weights = grown
+        
+        row_idx, feature_idx, values = [], [], []
+        for black_card, white_cards in data.items():
+            indices, features = card_features(black_card)
+            for white_card, score in white_cards.items():
+                row = rows[white_card] if white_card in rows else added[white_card]
+                row_idx.append(np.full(len(indices), row, dtype=np.intp))
+                feature_idx.append(indices)
+                values.append(features * score)
+        if values:
+            np.add.at(weights, (np.concatenate(row_idx), np.concatenate(feature_idx)), np.concatenate(values))
+        return added, weights
+    
+    def score_cards(self, black_card: 'BlackCard', cards: Sequence[str]) -> np.ndarray:
+        """Note chacune des cartes blanches pour cette carte noire (0 pour les cartes jamais jouées)"""
+        indices, weights = card_features(black_card.text)
+        rows = np.array([self.white_rows.get(card, -1) for card in cards], dtype=np.intp)
+        known = rows >= 0
+        scores = np.zeros(len(cards), dtype=np.float32)
+        scores[known] = self._weights[rows[known]][:, indices] @ weights
+        return scores
+    
+    def get_best_cards(self, black_card: 'BlackCard', hand: List[str], k: Optional[int] = None) -> List[str]:
+        """Renvoie les k cartes de la main les mieux notées pour cette carte noire, de la plus à la moins adaptée (départage au hasard)"""
+        if not hand:
+            return []
+        scores = self.score_cards(black_card, hand)
+        order = np.lexsort((self._rng.random(len(hand)), -scores))
+        return [hand[i] for i in order[:k or len(hand)]]
+    
+    def choose_proposal(self, black_card: 'BlackCard', proposals: Dict[str, List[str]]) -> str:
+        """Choisit une proposition parmi celles données, les mieux notées ayant le plus de chances d'être choisies
+
+        :param proposals: Cartes jouées par chaque joueur
+        :return: Identifiant du joueur choisi
+        """
+        keys = list(proposals)
+        sizes = np.array([len(proposals[key]) for key in keys])
+        scores = self.score_cards(black_card, [card for key in keys for card in proposals[key]])
+        means = np.bincount(np.repeat(np.arange(len(keys)), sizes), weights=scores, minlength=len(keys)) / np.maximum(sizes, 1)
+        scale = np.abs(means).max() or 1.0
+        choice = np.argmax(means / scale / CPU_VOTE_TEMPERATURE + self._rng.gumbel(size=len(keys))) # Tirage selon un softmax des scores
+        return keys[int(choice)]
+    
+    async def learn(self, data: Dict[str, Dict[str, int]]) -> None:
+        """Intègre les résultats d'une partie au modèle (entraînement hors de la boucle d'événements, une partie à la fois)"""
+        ids = self.intern([card for black_card, white_cards in data.items() for card in (black_card, *white_cards)])
+        rows = [(ids[black_card], ids[white_card], score) for black_card, white_cards in data.items() for white_card, score in white_cards.items()]
+        self._cog.update_training_data(rows)
+        async with self._learning:
+            if self._rows is not None:
+                added, weights = await asyncio.to_thread(self.__fit, self._rows, self._weights, data)
+                self._weights = weights
+                self._rows.update(added)
 
 
 class Player:
@@ -359,35 +604,24 @@ class BotPlayer(Player):
         self.id = name.lower()
         self.name = name
         
-        self.brain = self.__training_data()
-        
     def __str__(self) -> str:
         return self.name + ' <CPU>'
     
-    def __training_data(self) -> Dict[str, Dict[str, int]]:
-        return self._cog.get_training_data()
+    @property
+    def brain(self) -> CPUBrain:
+        return self._cog.brain
     
-    def _get_best_cards(self, black_card: 'BlackCard') -> List[str]:
+    def _get_best_cards(self, black_card: 'BlackCard', k: Optional[int] = None) -> List[str]:
         """Retourne les cartes les plus adaptées à la carte noire"""
-        if black_card.text not in self.brain:
-            return []
-        data_cards = {card: score for card, score in self.brain[black_card.text].items() if card in self.hand}
-        if not data_cards:
-            return []
-        return sorted(data_cards, key=data_cards.get, reverse=True) #type: ignore
+        return self.brain.get_best_cards(black_card, self.hand, k)
     
     def submit_cards(self, black_card: 'BlackCard') -> None:
         """Soumettre des cartes pour le round"""
-        best_cards = self._get_best_cards(black_card)
-        if len(best_cards) >= black_card.blanks:
-            cards = best_cards[:black_card.blanks]
-        else:
-            cards = random.sample(self.hand, black_card.blanks)
-        self.play(cards)
+        self.play(self._get_best_cards(black_card, black_card.blanks))
         
-    def vote(self, white_cards: Dict[str, List[Player]]) -> str:
-        """Voter pour une proposition au hasard"""
-        return random.choice(list(white_cards.keys()))
+    def vote(self, black_card: 'BlackCard', white_cards: Dict[str, List[str]]) -> str:
+        """Voter pour une proposition, de préférence celle que le modèle juge la plus drôle"""
+        return self.brain.choose_proposal(black_card, white_cards)
 
     
 class CardsPack:
@@ -493,57 +727,227 @@ class BlackCard:
             image_binary.seek(0)
             return discord.File(fp=image_binary, filename='black_card.png', description=self.__str__())
 
+class Deck(Generic[T]):
+    """Pioche mélangée au fil des tirages
+    
+    Les cartes forment un tableau partagé en lecture seule entre toutes les parties utilisant les mêmes packs, chaque pioche ne possède que sa permutation d'indices et sa position. 
+    Chaque tirage termine une étape du mélange de Fisher-Yates, remettre la défausse dans la pioche revient donc simplement à revenir au début de la permutation."""
+    def __init__(self, cards: Sequence[T], seed: Optional[int] = None, order: Optional[Iterable[int]] = None, position: int = 0) -> None:
+        self.cards = cards
+        self._rng = random.Random(seed)
+        self._order = array('I', range(len(cards)) if order is None else order)
+        self._position = position
+        
+    def __len__(self) -> int:
+        return len(self.cards) - self._position
+    
+    def draw(self, count: int = 1, exclude: Iterable[T] = ()) -> List[T]:
+        """Tire plusieurs cartes d'un coup, la défausse étant remélangée dès que la pioche est vide
+
+        Une carte déjà tirée dans le lot (la pioche ayant été remélangée entre-temps) ou présente dans `exclude` (ex. la main du joueur) est défaussée et remplacée.
+        """
+        order, size, rng = self._order, len(self.cards), self._rng
+        position = self._position
+        seen = set(exclude)
+        drawn = []
+        attempts = count + size # Au-delà, la pioche ne contient plus assez de cartes différentes
+        while len(drawn) < count and attempts:
+            attempts -= 1
+            if position >= size:
+                position = 0
+            swap = rng.randrange(position, size)
+            order[position], order[swap] = order[swap], order[position]
+            card = self.cards[order[position]]
+            position += 1
+            if card not in seen:
+                seen.add(card)
+                drawn.append(card)
+        self._position = position
+        return drawn
+    
+    def draw_one(self) -> T:
+        return self.draw(1)[0]
+    
+    def to_dict(self) -> dict:
+        return {'order': self._order.tolist(), 'position': self._position}
+    
+    @classmethod
+    def from_dict(cls, cards: Sequence[T], data: Optional[dict]) -> 'Deck[T]':
+        if not data or len(data['order']) != len(cards):
+            return cls(cards) # Les packs ont changé depuis la sauvegarde
+        return cls(cards, order=data['order'], position=data['position'])
+
 class ClassicGame:
     """Logique de jeu pour une partie de Anarchy classique"""
     
-    def __init__(self, cog: 'Anarchy', channel: Union[discord.TextChannel, discord.Thread], rounds: int, author: Union[discord.User, discord.Member]) -> None:
+    def __init__(self, cog: 'Anarchy', channel: Union[discord.TextChannel, discord.Thread], rounds: int, author: Union[discord.User, discord.Member], large: bool = False, seed: Optional[int] = None, clock: Optional[Clock] = None, headless: bool = False, pacing: str = 'classic') -> None:
         self._cog = cog
         self.channel = channel
         self.rounds = rounds
         self.author = author
+        self.large = large
+        self.seed = seed
+        self.clock = clock or Clock()
+        self.headless = headless # Pas de rendu d'images (simulations)
+        self.pacing = pacing if pacing in PACING_PROFILES else 'classic'
+        self.persistent = True # Sauvegarde de l'état pour reprise après un redémarrage
+        self.budget = SendBudget(clock=clock) if clock else SendBudget.for_channel(channel.id)
+        self.board = GameBoard(channel, self.budget, interval=BOARD_REFRESH_INTERVAL)
         
         self.training = CPUTraining(self._cog)
         
         self.packs : List[CardsPack] = []
         self.players : List[Player] = []
+        self._players_by_id : Dict[Union[int, str], Player] = {}
         self.round = 0
         
         self.round_black_card : BlackCard = None #type: ignore
-        self.black_cards : List[BlackCard] = []
+        self.black_deck : Optional[Deck[BlackCard]] = None
         
         self.round_white_cards : Dict[str, list] = {}
-        self.white_cards : List[str] = []
-        
-        self.used_black_cards : List[BlackCard] = []
-        self.used_white_cards : List[str] = []
+        self.white_deck : Optional[Deck[str]] = None
         
-        self.votes : Dict[str, List[Player]] = {}
-        self.voters : List[Player] = []
+        self.votes : Dict[str, Set[Player]] = {}
+        self.voters : Dict[Player, str] = {}
         self.white_cards_human : Dict[str, int] = {}
         
         self.status = 'register'
+        self.phase = 'new_round'
+        self.round_message_id : Optional[int] = None
+        self.round_image_url : Optional[str] = None
+        self.vote_message_id : Optional[int] = None
+        self.resumed = False
+        self.task : Optional[asyncio.Task] = None
+        
+    @property
+    def max_players(self) -> int:
+        return MAX_PLAYERS_LARGE if self.large else MAX_PLAYERS
+    
+    def timeout(self, name: str) -> float:
+        """Temps de réponse accordé aux joueurs pour cette étape, selon le rythme de la partie"""
+        return TIMEOUTS[name] * PACING_PROFILES[self.pacing]['timeouts']
+    
+    async def pause(self, delay: float, done: bool = False) -> None:
+        """Pause entre deux phases, selon le rythme de la partie
+
+        :param delay: Durée de la pause au rythme classique
+        :param done: Si tous les joueurs ont déjà agi, auquel cas le mode turbo n'attend pas
+        """
+        profile = PACING_PROFILES[self.pacing]
+        if done and profile['skip_when_done']:
+            return
+        await self.clock.sleep(delay * profile['delays'])
+    
+    def ephemeral_delay(self, delay: float) -> Optional[float]:
+        """Délai de suppression des réponses éphémères, désactivé en grand lobby pour ne pas multiplier les appels à l'API"""
+        return None if self.large else delay
+    
+    async def send(self, *args, **kwargs) -> discord.Message:
+        """Envoie un message dans le salon de la partie en respectant le budget d'envois"""
+        await self.budget.acquire()
+        return await self.channel.send(*args, **kwargs)
+    
+    async def edit(self, message: discord.Message, **kwargs) -> discord.Message:
+        """Modifie un message de la partie en respectant le budget d'envois"""
+        await self.budget.acquire()
+        return await message.edit(**kwargs)
+    
+    # Sauvegarde ==============
+    
+    def to_dict(self) -> dict:
+        """Etat de la partie à la dernière étape terminée, utilisé pour la reprendre après un redémarrage"""
+        return {
+            'guild_id': self.channel.guild.id,
+            'channel_id': self.channel.id,
+            'author_id': self.author.id,
+            'rounds': self.rounds,
+            'round': self.round,
+            'large': self.large,
+            'pacing': self.pacing,
+            'phase': self.phase,
+            'packs': [pack.id for pack in self.packs],
+            'players': [{'id': player.id, 'cpu': isinstance(player, BotPlayer), 'name': str(player.name) if isinstance(player, BotPlayer) else None, 'score': player.score, 'hand': player.hand} for player in self.players],
+            'black_deck': self.black_deck.to_dict() if self.black_deck else None,
+            'white_deck': self.white_deck.to_dict() if self.white_deck else None,
+            'round_black_card': self.round_black_card.text if self.round_black_card else None,
+            'round_white_cards': self.round_white_cards,
+            'round_message_id': self.round_message_id,
+            'round_image_url': self.round_image_url,
+            'vote_message_id': self.vote_message_id,
+            'training': self.training.data
+        }
+        
+    @classmethod
+    def from_dict(cls, cog: 'Anarchy', channel: Union[discord.TextChannel, discord.Thread], data: dict) -> 'ClassicGame':
+        """Recrée une partie à partir de sa dernière sauvegarde"""
+        guild = channel.guild
+        author = guild.get_member(data['author_id']) or guild.me
+        game = cls(cog, channel, data['rounds'], author, data['large'], pacing=data.get('pacing', 'classic'))
+        game.round = data['round']
+        game.phase = data['phase']
+        game.packs = [pack for pack in cog.Packs if pack.id in data['packs']]
+        for pdata in data['players']:
+            if pdata['cpu']:
+                player = BotPlayer(cog, pdata['name'])
+            else:
+                member = guild.get_member(pdata['id'])
+                if not member:
+                    continue # Le joueur a quitté le serveur entre temps
+                player = HumanPlayer(member)
+            player.score = pdata['score']
+            player.hand = pdata['hand']
+            game.add_player(player)
+        black_cards, white_cards = cog.get_deck_cards(game.packs)
+        game.black_deck = Deck.from_dict(black_cards, data['black_deck'])
+        game.white_deck = Deck.from_dict(white_cards, data['white_deck'])
+        game.round_black_card = BlackCard(data['round_black_card']) if data['round_black_card'] else None #type: ignore
+        game.round_white_cards = {player_id: cards for player_id, cards in data['round_white_cards'].items() if player_id in game._players_by_id}
+        game.round_message_id = data['round_message_id']
+        game.round_image_url = data['round_image_url']
+        game.vote_message_id = data['vote_message_id']
+        game.training.data = data['training']
+        game.resumed = True
+        return game
+    
+    def checkpoint(self) -> None:
+        """Sauvegarde l'état de la partie"""
+        if self.persistent:
+            self._cog.save_session(self)
+        self._cog.sessions.touch(self.channel.id)
+        
+    async def _fetch_view_message(self, message_id: Optional[int], view: discord.ui.View) -> Optional[discord.Message]:
+        """Rattache une vue persistante à un message envoyé avant l'interruption de la partie"""
+        if not message_id:
+            return None
+        try:
+            message = await self.channel.fetch_message(message_id)
+        except discord.HTTPException:
+            return None
+        self._cog.bot.add_view(view, message_id=message_id)
+        return message
     
     def _load_cards(self, packs: List[CardsPack]) -> None:
         self.packs = packs
-        self.black_cards = list(set([card for pack in packs for card in pack.black_cards]))
-        random.shuffle(self.black_cards)
-        self.white_cards = list(set([card for pack in packs for card in pack.white_cards]))
-        random.shuffle(self.white_cards)
+        black_cards, white_cards = self._cog.get_deck_cards(packs)
+        rng = random.Random(self.seed)
+        self.black_deck = Deck(black_cards, seed=rng.random())
+        self.white_deck = Deck(white_cards, seed=rng.random())
         
     # Players =================
         
     def add_player(self, player: Player) -> None:
         self.players.append(player)
+        # Indexé par l'identifiant brut et sa version texte (valeurs des menus de sélection)
+        self._players_by_id[player.id] = player
+        self._players_by_id[str(player.id)] = player
     
     def remove_player(self, player: Player) -> None:
         self.players.remove(player)
+        self._players_by_id.pop(player.id, None)
+        self._players_by_id.pop(str(player.id), None)
         
     def get_player_by_id(self, player_id: Union[int, str]) -> Optional[Player]:
-        player_id = str(player_id)
-        for player in self.players:
-            if str(player.id) == player_id:
-                return player
-        return None
+        return self._players_by_id.get(player_id)
     
     def fill_players(self) -> None:
         names = CPU_NAMES.copy()
@@ -554,27 +958,11 @@ class ClassicGame:
     # Cartes ==================
     
     def draw_black_card(self) -> BlackCard:
-        if not self.black_cards:
-            self.black_cards = self.used_black_cards
-            self.used_black_cards = []
-            random.shuffle(self.black_cards)
-        card = self.black_cards.pop()
-        self.used_black_cards.append(card)
-        return card
-    
-    def draw_white_card(self) -> str:
-        if not self.white_cards:
-            self.white_cards = self.used_white_cards
-            self.used_white_cards = []
-            random.shuffle(self.white_cards)
-        card = self.white_cards.pop()
-        self.used_white_cards.append(card)
-        return card
+        return self.black_deck.draw_one() #type: ignore
     
     def fill_players_hands(self) -> None:
         for player in self.players:
-            pcards = [self.draw_white_card() for _ in range(HAND_SIZE - len(player.hand))]
-            player.draw(pcards)
+            player.draw(self.white_deck.draw(HAND_SIZE - len(player.hand), exclude=player.hand)) #type: ignore
                 
     def cpu_submit_cards(self) -> None:
         for player in self.players:
@@ -584,7 +972,7 @@ class ClassicGame:
     def fetch_round_cards(self) -> None:
         self.round_white_cards = {}
         for player in self.players:
-            if not isinstance(player, Player):
+            if not player.played_cards:
                 continue
             self.round_white_cards[str(player.id)] = player.played_cards
             player.played_cards = []
@@ -592,39 +980,36 @@ class ClassicGame:
     # Votes ===================
     
     def add_vote(self, player: Player, voted_player_id: str) -> bool:
+        """Enregistre le vote d'un joueur, en remplaçant son vote précédent s'il y en a un"""
         voted = self.get_player_by_id(voted_player_id)
-        if not voted:
+        if voted is None:
             return False
         if voted.id == player.id:
             return False # On ne peut pas voter pour soi-même
-        if not voted_player_id in self.votes:
-            self.votes[voted_player_id] = []
-        self.votes[voted_player_id].append(player)
-        self.voters.append(player)
+        self.clear_player_vote(player)
+        self.votes.setdefault(voted_player_id, set()).add(player)
+        self.voters[player] = voted_player_id
         return True
     
     def clear_player_vote(self, player: Player) -> None:
-        for player_id, voters in self.votes.items():
-            if player in voters:
-                self.votes[player_id].remove(player)
-                self.voters.remove(player)
+        voted_player_id = self.voters.pop(player, None)
+        if voted_player_id is not None:
+            self.votes[voted_player_id].discard(player)
                 
     def cpu_votes(self) -> None:
         for player in self.players:
             if isinstance(player, BotPlayer):
-                while self.add_vote(player, player.vote(self.round_white_cards)) == False:
-                    pass
+                candidates = {player_id: cards for player_id, cards in self.round_white_cards.items() if player_id != str(player.id)}
+                if candidates:
+                    self.add_vote(player, player.vote(self.round_black_card, candidates))
                 
     def fetch_votes(self) -> Dict[Player, int]:
-        votes = {}
-        for player_id, voters in self.votes.items():
-            player = self.get_player_by_id(player_id)
-            votes[player] = len(voters)
-        return votes
+        return {self._players_by_id[player_id]: len(voters) for player_id, voters in self.votes.items()}
     
     def get_winners(self) -> List[Player]:
         votes = self.fetch_votes()
-        winners = [k for k, v in votes.items() if v == max(votes.values())]
+        top = max(votes.values(), default=0)
+        winners = [k for k, v in votes.items() if v == top]
         return winners
                 
     # Vues ===================
@@ -635,12 +1020,12 @@ class ClassicGame:
             return False
         packs = [pack for pack in self._cog.Packs if pack.is_available(guild)]
         
-        view = discord.ui.View(timeout=TIMEOUTS['select_cardpacks'])
+        view = discord.ui.View(timeout=self.timeout('select_cardpacks'))
         view.add_item(ChoosePacksSelect(self, packs))
         await original_interaction.response.send_message('Choisissez les packs de cartes à utiliser pour cette partie', view=view, ephemeral=True)
-        while not self.black_cards and not self.white_cards and not view.is_finished():
-            await asyncio.sleep(0.5)
-        if not self.black_cards and not self.white_cards:
+        while self.black_deck is None and not view.is_finished():
+            await self.clock.sleep(0.5)
+        if self.black_deck is None:
             return False
         await original_interaction.edit_original_response(view=None)
         view.stop()
@@ -657,84 +1042,136 @@ class ClassicGame:
     # Jeu ====================
     
     async def start_game(self) -> bool:
-        await self.channel.send("**Anarchy ·** La partie va bientôt commencer !", delete_after=20)
-        await asyncio.sleep(3)
-        while self.round < self.rounds:
-            self.round += 1
+        if self.resumed:
+            await self.send(f"**Anarchy ·** Reprise de la partie interrompue (Round {self.round}/{self.rounds})", delete_after=20)
+        else:
+            await self.send("**Anarchy ·** La partie va bientôt commencer !", delete_after=20)
+            self.checkpoint()
+        await self.pause(3)
+        while self.phase != 'new_round' or self.round < self.rounds:
             await self.start_round()
         await self.end_game()
         return True
     
     async def start_round(self) -> None:
-        # Initialisation du round
-        self.fill_players_hands()
-        await self.channel.send(f"**~~            ~~ Round {self.round} ~~            ~~**\nVos cartes blanches ont été distribuées.")
-        
-        # Choix de la carte noire
-        self.round_black_card = self.draw_black_card()
-        await asyncio.sleep(2.5)
-        
+        if self.phase == 'new_round':
+            self.round += 1
+            # Initialisation du round
+            self.fill_players_hands()
+            
+            # Choix de la carte noire
+            self.round_black_card = self.draw_black_card()
+            self.round_message_id = self.vote_message_id = None
+            self.phase = 'choose_cards'
+            
+        if self.phase == 'choose_cards':
+            await self.play_cards()
+            self.phase = 'vote_round'
+            
+        if self.phase == 'vote_round':
+            await self.vote_cards()
+            await self.announce_results()
+            self.phase = 'new_round'
+            self.checkpoint()
+        
+            if self.round < self.rounds:
+                await self.pause(14)
+            else:
+                await self.pause(8)
+    
+    async def play_cards(self) -> None:
         # Affichage de la carte noire et proposition des cartes blanches
         self.status = 'choose_cards'
         choosecardsview = ChooseCardsView(self)
-        await choosecardsview.start()
+        choosecardsview.message = await self._fetch_view_message(self.round_message_id, choosecardsview) #type: ignore
+        if choosecardsview.message:
+            self.board.attach(choosecardsview.message)
+        else:
+            await choosecardsview.start()
+            self.round_message_id = choosecardsview.message.id
+            self.round_image_url = choosecardsview.message.attachments[0].url if choosecardsview.message.attachments else None
+            self.checkpoint()
         self.cpu_submit_cards() # On fait jouer les bots
-        timeout = time.time() + TIMEOUTS['play_round']
-        while len([p for p in self.players if p.played_cards]) < len(self.players) and time.time() < timeout:
-            await asyncio.sleep(0.5)
-        await asyncio.sleep(2)
-        choosemsg = choosecardsview.message
+        timeout = self.clock.time() + self.timeout('play_round')
+        played = 0
+        while played < len(self.players) and self.clock.time() < timeout:
+            count = len([p for p in self.players if p.played_cards])
+            if count != played:
+                played = count
+                self.board.update(content=choosecardsview.get_content(f"`{played}/{len(self.players)}` joueurs ont joué"))
+            await self.clock.sleep(0.5)
+        all_played = len([p for p in self.players if p.played_cards]) == len(self.players)
+        await self.pause(2, done=all_played)
         choosecardsview.stop()
         self.status = 'idle'
-        await choosemsg.edit(view=None)
         
-        if len([p for p in self.players if p.played_cards]) < len(self.players):
-            await self.channel.send(f"**Round {self.round} ·** Temps écoulé ! Tous les joueurs qui n'ont pas joué ne pourront recevoir de points.")
+        if not all_played:
+            notice = f"**Round {self.round} ·** Temps écoulé ! Tous les joueurs qui n'ont pas joué ne pourront recevoir de points."
         else:
-            await self.channel.send(f"**Round {self.round} ·** Tous les joueurs ont joué ! Préparez-vous à voter...")
+            notice = f"**Round {self.round} ·** Tous les joueurs ont joué ! Préparez-vous à voter..."
+        await self.board.flush(content=choosecardsview.get_content(notice), view=None)
             
         for player in self.players:
             player.status = 'idle'
-        await asyncio.sleep(4.5)
+        await self.pause(4.5, done=all_played)
+        self.fetch_round_cards()
         
+    async def vote_cards(self) -> None:
         # Vote de la meilleure carte blanche
-        self.fetch_round_cards()
-        await asyncio.sleep(1)
+        await self.pause(1, done=True)
         self.votes = {}
-        self.voters = []
+        self.voters = {}
         self.white_cards_human = {}
         self.status = 'vote_round'
-        await self.channel.send(f"**~~          ~~ Ouverture des votes ~~          ~~**")
-        embed = discord.Embed(description=f"***{self.round_black_card.wrap_blanks()}***", color=discord.Color.blurple())
-        embed.set_image(url=choosemsg.attachments[0].url)
-        embed.set_footer(text=f"Round {self.round} · Votez pour la carte blanche qui vous semble la plus drôle !")
-        voteview = discord.ui.View(timeout=None)
-        voteview.add_item(VoteBestCardsSelect(self))
-        votemsg = await self.channel.send(embed=embed, view=voteview)
+        if self.large:
+            voteview = OpenVoteView(self)
+        else:
+            voteview = discord.ui.View(timeout=None)
+            voteview.add_item(VoteBestCardsSelect(self))
+        header = f"**~~          ~~ Ouverture des votes ~~          ~~**"
+        votemsg = await self._fetch_view_message(self.vote_message_id, voteview)
+        if votemsg:
+            self.board.attach(votemsg)
+        else:
+            embed = discord.Embed(description=f"***{self.round_black_card.wrap_blanks()}***", color=discord.Color.blurple())
+            embed.set_image(url=self.round_image_url)
+            embed.set_footer(text=f"Round {self.round} · Votez pour la carte blanche qui vous semble la plus drôle !")
+            votemsg = await self.board.post(content=header, embed=embed, view=voteview)
+            self.vote_message_id = votemsg.id
+            self.checkpoint()
         self.cpu_votes() # On fait voter les bots
-        timeout = time.time() + TIMEOUTS['vote_round']
-        while len(self.voters) < len(self.players) and time.time() < timeout:
-            await asyncio.sleep(0.5)
-        await asyncio.sleep(4)
+        timeout = self.clock.time() + self.timeout('vote_round')
+        voted = 0
+        while voted < len(self.players) and self.clock.time() < timeout:
+            if len(self.voters) != voted:
+                voted = len(self.voters)
+                self.board.update(content=f"{header}\n`{voted}/{len(self.players)}` joueurs ont voté")
+            await self.clock.sleep(0.5)
+        all_voted = len(self.voters) == len(self.players)
+        await self.pause(4, done=all_voted)
         self.status = 'idle'
         voteview.stop()
-        await votemsg.edit(view=None)
-        all_voters = self.voters.copy()
-        if len(self.voters) < len(self.players):
-            await self.channel.send(f"**Round {self.round} ·** Temps écoulé ! Les joueurs n'ayant pas voté perdent un point.")
+        all_voters = set(self.voters)
+        if not all_voted:
+            notice = f"**Round {self.round} ·** Temps écoulé ! Les joueurs n'ayant pas voté perdent un point."
             for player in self.players:
                 if player not in all_voters:
                     player.score = max(0, player.score - 1)
         else:
-            await self.channel.send(f"**Round {self.round} ·** Tous les joueurs ont voté !")
+            notice = f"**Round {self.round} ·** Tous les joueurs ont voté !"
+        await self.board.flush(content=f"{header}\n{notice}", view=None)
             
         self.training.register_round(self.round_black_card, self.white_cards_human)
             
         for player in self.players:
             player.status = 'idle'
-        await asyncio.sleep(5)
+        await self.pause(5, done=all_voted)
         
-        # Annonce du gagnant du round
+    def score_round(self) -> Tuple[Dict[Player, int], List[Player]]:
+        """Attribue les points du round en fonction des votes
+
+        :return: Nombre de votes par joueur et gagnants du round
+        """
         votes = self.fetch_votes()
         winners = self.get_winners()
         for player in winners:
@@ -742,46 +1179,45 @@ class ClassicGame:
         for player in votes:
             if votes[player] > 0:
                 player.score += VOTED_POINTS
+        return votes, winners
+    
+    async def announce_results(self) -> None:
+        # Annonce du gagnant du round
+        votes, winners = self.score_round()
         
         em = discord.Embed(title=f"**Round {self.round} ·** Résultats", color=discord.Color.blurple())
         winners_txt = "\n".join([f"**{player}** · {self.round_black_card.fill(self.round_white_cards[str(player.id)], with_codeblock=True)}" for player in winners])
-        em.add_field(name=f"Gagnant(s) ({max(votes.values())} votes)", value=winners_txt)
-        em.add_field(name="Scores", value="\n".join([f"• **{player}** · {player.score} points" for player in self.players]), inline=False)
+        em.add_field(name=f"Gagnant(s) ({max(votes.values(), default=0)} votes)", value=pretty.troncate_text(winners_txt, 1024) or "Aucun vote")
+        ranking = sorted(self.players, key=lambda p: p.score, reverse=True)[:10] if self.large else self.players
+        em.add_field(name="Scores" if not self.large else f"Scores (Top {len(ranking)}/{len(self.players)})", value="\n".join([f"• **{player}** · {player.score} points" for player in ranking]), inline=False)
         em.set_footer(text=f"Les gagnants ont reçu 3 points et ceux ayant eu au moins un vote ont reçu 1 point.")
-        await self.channel.send(embed=em, view=ExportBlackCardsView(self))
-        
-        if self.round < self.rounds:
-            await asyncio.sleep(14)
-        else:
-            await asyncio.sleep(8)
+        await self.send(embed=em, view=ExportBlackCardsView(self))
     
     async def end_game(self) -> None:
-        await self.channel.send("**~~            ~~ Fin de la partie ~~            ~~**")
-        await asyncio.sleep(1.5)
+        self.board.close()
+        header = "**~~            ~~ Fin de la partie ~~            ~~**\n"
         
-        winners = [player for player in self.players if player.score == max([p.score for p in self.players])]
-        path = get_package_path('anarchy')
+        top_score = max(p.score for p in self.players)
+        winners = [player for player in self.players if player.score == top_score]
         
-        if len(winners) == 1:
+        if len(winners) == 1 and self.headless:
+            await self.send(f"{header}**Anarchy ·** La partie est terminée !\nFélicitations à **{winners[0]}** pour sa victoire !")
+        elif len(winners) == 1:
             textcard = random.choice(END_CARD_TEXT).format(winners[0])
             if isinstance(winners[0], HumanPlayer):
-                userpfp = await winners[0].user.display_avatar.read()
-                userpfp = Image.open(BytesIO(userpfp))
+                userpfp = await self._cog.get_avatar_image(winners[0].user)
             else:
-                userpfp = Image.open(f"{path}/assets/bot_image.png")
+                userpfp = await self._cog.get_bot_avatar_image()
                 
-            with BytesIO() as image_binary:
-                winner_img = await self._cog.generate_end_card_img(userpfp, textcard)
-                winner_img.save(image_binary, 'PNG')
-                image_binary.seek(0)
-                await self.channel.send(f"**Anarchy ·** La partie est terminée !\nFélicitations à **{winners[0]}** pour sa victoire !", file=discord.File(fp=image_binary, filename='winner.png', description=textcard))
+            image_binary = await self._cog.generate_end_card_img(userpfp, textcard)
+            with image_binary:
+                await self.send(f"{header}**Anarchy ·** La partie est terminée !\nFélicitations à **{winners[0]}** pour sa victoire !", file=discord.File(fp=image_binary, filename='winner.png', description=textcard))
         else:
-            await self.channel.send(f"**Anarchy ·** La partie est terminée !\nFélicitations à **{', '.join([str(w) for w in winners])}** pour leur victoire !")
+            await self.send(f"{header}**Anarchy ·** La partie est terminée !\nFélicitations à **{', '.join([str(w) for w in winners])}** pour leur victoire !")
         
-        for winner in [w for w in winners if isinstance(w, HumanPlayer)]:
-            self._cog.update_player_score(self.channel.guild, winner.user)
+        self._cog.update_players_scores(self.channel.guild, [w.user for w in winners if isinstance(w, HumanPlayer)])
             
-        self.training.save()
+        await self.training.save()
         
 # COG -------------------------------------------------------------------------------------------------------------------------------
         
@@ -790,31 +1226,129 @@ class Anarchy(commands.GroupCog, name="anarchy", description="Jeu inspiré de Ca
 
     def __init__(self, bot: commands.Bot):
         self.bot = bot
-        self.sessions = []
+        self.sessions : SessionRegistry[ClassicGame] = SessionRegistry(ttl=SESSION_RESUME_DELAY)
+        self.brain = CPUBrain(self)
+        
+        self.Packs : List[CardsPack] = []
+        self.__packs_files : Dict[str, Tuple[float, CardsPack]] = {}
+        self.__packs_errors : Dict[str, float] = {} # Fichiers invalides et date de modification ayant échoué
+        self.__decks_cards : Dict[Tuple[str, ...], Tuple[Tuple[BlackCard, ...], Tuple[str, ...]]] = {}
+        self.__avatars : 'OrderedDict[str, Image.Image]' = OrderedDict()
+        
+    async def cog_load(self) -> None:
+        self.__load_package_files()
+        self.reload_packs.start()
+        self.cleanup_sessions.start()
+        if self.bot.is_ready(): # Rechargement du module
+            self.__initialize_database()
+            await self.brain.load()
+            await self.restore_sessions()
+        
+    async def cog_unload(self) -> None:
+        self.reload_packs.cancel()
+        self.cleanup_sessions.cancel()
+        for session in self.sessions:
+            if session.task:
+                session.task.cancel() # La sauvegarde est conservée pour être reprise par le module rechargé
     
     @commands.Cog.listener()
     async def on_ready(self):
-        self.Packs = self.__load_package_files()
         self.__initialize_database()
+        await self.brain.load()
+        await self.restore_sessions()
         
     @commands.Cog.listener()
     async def on_guild_join(self, guild: discord.Guild):
         self.__initialize_database(guild)
+        
+    @tasks.loop(seconds=PACKS_RELOAD_INTERVAL)
+    async def reload_packs(self):
+        """Recharge les packs de cartes dont les fichiers ont été ajoutés, modifiés ou supprimés"""
+        self.__load_package_files()
+    
+    @tasks.loop(minutes=5)
+    async def cleanup_sessions(self):
+        """Arrête les parties qui n'ont plus donné signe de vie depuis trop longtemps"""
+        self.stop_abandoned_sessions()
+        
+    def stop_abandoned_sessions(self) -> None:
+        """Retire du registre les parties abandonnées, arrête leur tâche et supprime leur sauvegarde"""
+        for session in self.sessions.cleanup():
+            logger.warning(f"Partie abandonnée dans le salon {session.channel.id}, arrêt forcé")
+            if session.task:
+                session.task.cancel()
+            self.delete_session(session.channel.id)
     
-    def __load_package_files(self) -> List[CardsPack]:
-        files = get_package_path('anarchy')
-        packs = []
-        for file in os.listdir(files):
-            if file.endswith(".yaml"):
-                with open(os.path.join(files, file), 'r', encoding='utf-8') as f:
-                    pack = yaml.safe_load(f)
-                    packs.append(CardsPack(pack))
-        return packs
+    def __load_package_files(self) -> None:
+        folder = get_package_path('anarchy')
+        files = {file: os.path.getmtime(os.path.join(folder, file)) for file in os.listdir(folder) if file.endswith(".yaml")}
+        known = {file: entry[0] for file, entry in self.__packs_files.items()}
+        known.update(self.__packs_errors)
+        if files == known:
+            return
+        
+        cache_path = get_data_file_path('anarchy', 'packs_cache.json')
+        try:
+            with open(cache_path, 'r', encoding='utf-8') as f:
+                cache = json.load(f)
+        except (OSError, ValueError):
+            cache = {}
+        
+        packs_files, errors = {}, {}
+        for file, mtime in files.items():
+            if file in self.__packs_files and self.__packs_files[file][0] == mtime:
+                packs_files[file] = self.__packs_files[file]
+                continue
+            if self.__packs_errors.get(file) != mtime:
+                try:
+                    entry = cache.get(file, {})
+                    if entry.get('mtime') != mtime:
+                        with open(os.path.join(folder, file), 'r', encoding='utf-8') as f:
+                            entry = {'mtime': mtime, 'data': yaml.load(f, Loader=YAML_LOADER)}
+                    packs_files[file] = (mtime, CardsPack(entry['data']))
+                except Exception as e:
+                    logger.error(f"Pack de cartes '{file}' invalide, la version précédente est conservée : {e}", exc_info=True)
+                else:
+                    if cache.get(file) is not entry:
+                        cache[file] = entry
+                        logger.info(f"Pack de cartes '{file}' compilé")
+                    continue
+            # Fichier invalide : on garde l'ancienne version du pack jusqu'à la prochaine modification du fichier
+            errors[file] = mtime
+            if file in self.__packs_files:
+                packs_files[file] = self.__packs_files[file]
+        
+        cache = {file: cache[file] for file in files if file in cache}
+        try:
+            with open(cache_path, 'w', encoding='utf-8') as f:
+                json.dump(cache, f, ensure_ascii=False, default=str)
+        except OSError as e:
+            logger.error(f"Impossible d'écrire le cache des packs de cartes : {e}")
+        
+        self.__packs_errors = errors
+        
+        self.__packs_files = packs_files
+        self.Packs = [pack for _, pack in packs_files.values()]
+        self.__decks_cards = {}
+        
+    def get_deck_cards(self, packs: List[CardsPack]) -> Tuple[Tuple[BlackCard, ...], Tuple[str, ...]]:
+        """Renvoie les cartes noires et blanches (sans doublons) des packs donnés, partagées entre toutes les parties qui les utilisent"""
+        key = tuple(sorted(pack.id for pack in packs))
+        if key not in self.__decks_cards:
+            packs = sorted(packs, key=lambda p: p.id)
+            black_cards = tuple(dict.fromkeys(card for pack in packs for card in pack.black_cards))
+            white_cards = tuple(dict.fromkeys(card for pack in packs for card in pack.white_cards))
+            self.__decks_cards[key] = (black_cards, white_cards)
+        return self.__decks_cards[key]
     
     def __initialize_database(self, guild: Optional[discord.Guild] = None):
         conn = get_sqlite_database('anarchy')
         cursor = conn.cursor()
-        cursor.execute("CREATE TABLE IF NOT EXISTS training (black_card TEXT PRIMARY KEY, white_cards LONGTEXT)")
+        cursor.execute("CREATE TABLE IF NOT EXISTS cards (id INTEGER PRIMARY KEY, text TEXT UNIQUE)")
+        cursor.execute("CREATE TABLE IF NOT EXISTS training_scores (black_id INTEGER, white_id INTEGER, score INTEGER DEFAULT 0, PRIMARY KEY (black_id, white_id)) WITHOUT ROWID")
+        cursor.execute("DROP INDEX IF EXISTS training_scores_rank") # Plus aucune requête ne classe les scores en base
+        cursor.execute("CREATE TABLE IF NOT EXISTS sessions (channel_id INTEGER PRIMARY KEY, data TEXT, updated_at INTEGER)")
+        self.__migrate_legacy_training(cursor)
         conn.commit()
         cursor.close()
         conn.close()
@@ -824,54 +1358,197 @@ class Anarchy(commands.GroupCog, name="anarchy", description="Jeu inspiré de Ca
             conn = get_sqlite_database('anarchy', f'g{g.id}')
             cursor = conn.cursor()
             cursor.execute("CREATE TABLE IF NOT EXISTS players (user_id INTEGER PRIMARY KEY, score INTEGER DEFAULT 0)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS players_score ON players (score DESC)")
+            cursor.execute("CREATE TABLE IF NOT EXISTS settings (setting_name TEXT PRIMARY KEY, value TEXT)")
+            for name, default_value in DEFAULT_SETTINGS:
+                cursor.execute("INSERT OR IGNORE INTO settings (setting_name, value) VALUES (?, ?)", (name, json.dumps(default_value)))
             conn.commit()
             cursor.close()
             conn.close()
             
-    def update_player_score(self, guild: discord.Guild, user: Union[discord.User, discord.Member]):
-        conn = get_sqlite_database('anarchy', f'g{guild.id}')
+    # Sessions ---------------------------------------------------------------
+    
+    def save_session(self, session: ClassicGame):
+        conn = get_sqlite_database('anarchy')
         cursor = conn.cursor()
-        cursor.execute("SELECT score FROM players WHERE user_id = ?", (user.id,))
-        current_score = cursor.fetchone()
-        new_score = current_score[0] + 1 if current_score else 1
+        cursor.execute("INSERT OR REPLACE INTO sessions (channel_id, data, updated_at) VALUES (?, ?, ?)", (session.channel.id, json.dumps(session.to_dict(), separators=(',', ':')), int(time.time())))
+        conn.commit()
+        cursor.close()
+        conn.close()
         
-        cursor.execute("INSERT OR REPLACE INTO players (user_id, score) VALUES (?, ?)", (user.id, new_score))
+    def delete_session(self, channel_id: int):
+        conn = get_sqlite_database('anarchy')
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM sessions WHERE channel_id = ?", (channel_id,))
         conn.commit()
         cursor.close()
         conn.close()
         
-    def get_players_scores(self, guild: discord.Guild) -> List[Tuple[int, int]]:
+    def get_saved_sessions(self, since: float = 0.0) -> List[dict]:
+        conn = get_sqlite_database('anarchy')
+        cursor = conn.cursor()
+        cursor.execute("SELECT data FROM sessions WHERE updated_at >= ?", (since,))
+        data = cursor.fetchall()
+        cursor.execute("DELETE FROM sessions WHERE updated_at < ?", (since,))
+        conn.commit()
+        cursor.close()
+        conn.close()
+        return [json.loads(row[0]) for row in data]
+    
+    async def run_session(self, session: ClassicGame):
+        """Joue une partie jusqu'à son terme puis efface sa sauvegarde"""
+        try:
+            await session.start_game()
+        except asyncio.CancelledError:
+            raise # Module déchargé ou bot arrêté : la partie sera reprise depuis sa sauvegarde
+        except Exception as e:
+            logger.error(f"Erreur dans la partie du salon {session.channel.id} : {e}", exc_info=True)
+            self.delete_session(session.channel.id)
+        else:
+            self.delete_session(session.channel.id)
+        finally:
+            self.sessions.remove(session.channel.id, session)
+        
+    async def restore_sessions(self):
+        """Reprend les parties interrompues par un redémarrage du bot ou un rechargement du module"""
+        for data in self.get_saved_sessions(time.time() - SESSION_RESUME_DELAY):
+            if data['channel_id'] in self.sessions:
+                continue
+            guild = self.bot.get_guild(data['guild_id'])
+            channel = guild.get_channel_or_thread(data['channel_id']) if guild else None
+            if not isinstance(channel, (discord.TextChannel, discord.Thread)):
+                self.delete_session(data['channel_id'])
+                continue
+            try:
+                session = ClassicGame.from_dict(self, channel, data)
+            except Exception as e:
+                logger.error(f"Impossible de reprendre la partie du salon {data['channel_id']} : {e}", exc_info=True)
+                self.delete_session(data['channel_id'])
+                continue
+            self.sessions.register(channel.id, session)
+            session.task = asyncio.create_task(self.run_session(session))
+            logger.info(f"Reprise de la partie du salon {channel.id} (Round {session.round}/{session.rounds})")
+            
+    # Paramètres -------------------------------------------------------------
+    
+    def get_guild_settings(self, guild: discord.Guild) -> dict:
+        """Obtenir les paramètres d'Anarchy du serveur
+
+        :param guild: Serveur des paramètres à récupérer
+        :return: dict
+        """
+        conn = get_sqlite_database('anarchy', f'g{guild.id}')
+        cursor = conn.cursor()
+        cursor.execute("SELECT setting_name, value FROM settings")
+        settings = cursor.fetchall()
+        cursor.close()
+        conn.close()
+        return {name: json.loads(value) for name, value in settings}
+    
+    def set_guild_settings(self, guild: discord.Guild, update: dict):
+        """Met à jour les paramètres d'Anarchy du serveur
+
+        :param guild: Serveur à mettre à jour
+        :param update: Paramètres à mettre à jour (les valeurs sont sérialisées en JSON)
+        """
         conn = get_sqlite_database('anarchy', f'g{guild.id}')
         cursor = conn.cursor()
-        cursor.execute("SELECT user_id, score FROM players ORDER BY score DESC")
+        cursor.executemany("INSERT INTO settings (setting_name, value) VALUES (?, ?) ON CONFLICT (setting_name) DO UPDATE SET value = excluded.value", [(name, json.dumps(value)) for name, value in update.items()])
+        conn.commit()
+        cursor.close()
+        conn.close()
+            
+    # Joueurs ----------------------------------------------------------------
+            
+    def update_players_scores(self, guild: discord.Guild, users: Iterable[Union[discord.User, discord.Member]]):
+        """Ajoute une victoire à chacun des membres, en une seule transaction"""
+        users = list(users)
+        if not users:
+            return
+        conn = get_sqlite_database('anarchy', f'g{guild.id}')
+        cursor = conn.cursor()
+        cursor.executemany("INSERT INTO players (user_id, score) VALUES (?, 1) ON CONFLICT(user_id) DO UPDATE SET score = score + 1", [(user.id,) for user in users])
+        conn.commit()
+        cursor.close()
+        conn.close()
+        
+    def get_players_scores(self, guild: discord.Guild, limit: Optional[int] = None) -> List[Tuple[int, int]]:
+        """Renvoie les scores des joueurs du serveur, du meilleur au moins bon
+
+        :param limit: Nombre maximal de joueurs à renvoyer, par défaut tous
+        """
+        conn = get_sqlite_database('anarchy', f'g{guild.id}')
+        cursor = conn.cursor()
+        cursor.execute("SELECT user_id, score FROM players ORDER BY score DESC LIMIT ?", (limit if limit is not None else -1,))
         players = cursor.fetchall()
         cursor.close()
         conn.close()
         
         return players
             
-    def update_training_data(self, data: dict):
-        current_data = self.get_training_data()
+    def __migrate_legacy_training(self, cursor) -> None:
+        """Convertit les anciennes tables d'entraînement (JSON par carte noire puis textes bruts) au format interné"""
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name IN ('training', 'training_cards')")
+        legacy = [row[0] for row in cursor.fetchall()]
+        if not legacy:
+            return
+        rows = []
+        if 'training' in legacy:
+            cursor.execute("SELECT black_card, white_cards FROM training")
+            rows.extend((black_card, white_card, count) for black_card, white_cards in cursor.fetchall() for white_card, count in json.loads(white_cards).items())
+        if 'training_cards' in legacy:
+            cursor.execute("SELECT black_card, white_card, count FROM training_cards")
+            rows.extend(cursor.fetchall())
+        cursor.executemany("INSERT OR IGNORE INTO cards (text) VALUES (?)", [(text,) for row in rows for text in row[:2]])
+        cursor.execute("SELECT text, id FROM cards")
+        ids = dict(cursor.fetchall())
+        cursor.executemany("INSERT INTO training_scores (black_id, white_id, score) VALUES (?, ?, ?) ON CONFLICT (black_id, white_id) DO UPDATE SET score = score + excluded.score", 
+                           [(ids[black_card], ids[white_card], count) for black_card, white_card, count in rows])
+        for table in legacy:
+            cursor.execute(f"DROP TABLE {table}")
+        logger.info(f"Migration de {len(rows)} entrées d'entraînement vers la table training_scores")
+        
+    def get_interned_cards(self) -> Dict[str, int]:
         conn = get_sqlite_database('anarchy')
         cursor = conn.cursor()
-        for black_card, white_cards in data.items():
-            if black_card not in current_data:
-                current_data[black_card] = {}
-            for white_card, count in white_cards.items():
-                current_data[black_card][white_card] = current_data[black_card].get(white_card, 0) + count
-            cursor.execute("INSERT OR REPLACE INTO training (black_card, white_cards) VALUES (?, ?)", (black_card, json.dumps(white_cards)))
+        cursor.execute("SELECT text, id FROM cards")
+        data = cursor.fetchall()
+        cursor.close()
+        conn.close()
+        return dict(data)
+    
+    def intern_cards(self, texts: List[str]) -> Dict[str, int]:
+        conn = get_sqlite_database('anarchy')
+        cursor = conn.cursor()
+        cursor.executemany("INSERT OR IGNORE INTO cards (text) VALUES (?)", [(text,) for text in texts])
+        cursor.execute(f"SELECT text, id FROM cards WHERE text IN ({', '.join('?' * len(texts))})", texts)
+        data = cursor.fetchall()
         conn.commit()
         cursor.close()
         conn.close()
+        return dict(data)
             
+    def update_training_data(self, rows: List[Tuple[int, int, int]]):
+        if not rows:
+            return
+        conn = get_sqlite_database('anarchy')
+        cursor = conn.cursor()
+        cursor.executemany("INSERT INTO training_scores (black_id, white_id, score) VALUES (?, ?, ?) ON CONFLICT (black_id, white_id) DO UPDATE SET score = score + excluded.score", rows)
+        conn.commit()
+        cursor.close()
+        conn.close()
+        
     def get_training_data(self) -> Dict[str, Dict[str, int]]:
         conn = get_sqlite_database('anarchy')
         cursor = conn.cursor()
-        cursor.execute("SELECT black_card, white_cards FROM training")
+        cursor.execute("SELECT b.text, w.text, t.score FROM training_scores t JOIN cards b ON b.id = t.black_id JOIN cards w ON w.id = t.white_id")
         data = cursor.fetchall()
         cursor.close()
         conn.close()
-        return {black_card: json.loads(white_cards) for black_card, white_cards in data}
+        training = {}
+        for bc, white_card, score in data:
+            training.setdefault(bc, {})[white_card] = score
+        return training
     
     def __add_corners(self, im, rad):
         circle = Image.new('L', (rad * 2, rad * 2), 0)
@@ -886,11 +1563,53 @@ class Anarchy(commands.GroupCog, name="anarchy", description="Jeu inspiré de Ca
         im.putalpha(alpha)
         return im
     
-    async def generate_end_card_img(self, user_image, text: str):
+    def __prepare_avatar(self, data: Union[bytes, str]) -> Image.Image:
+        with Image.open(BytesIO(data) if isinstance(data, bytes) else data) as im:
+            im.draft('RGB', (440, 440)) # Décodage JPEG à taille réduite
+            userpfp = im.convert('RGBA').resize((440, 440))
+        return self.__add_corners(userpfp, 16)
+    
+    def __cache_avatar(self, key: str, image: Image.Image) -> Image.Image:
+        self.__avatars[key] = image
+        self.__avatars.move_to_end(key)
+        while len(self.__avatars) > AVATAR_CACHE_SIZE:
+            self.__avatars.popitem(last=False)
+        return image
+    
+    async def get_avatar_image(self, user: Union[discord.User, discord.Member]) -> Image.Image:
+        """Renvoie l'avatar du membre prêt à être collé sur la carte de fin (mis en cache par hash d'avatar)
+
+        :param user: Membre dont on veut l'avatar
+        :return: Image 440x440 aux coins arrondis
+        """
+        asset = user.display_avatar.with_size(AVATAR_SIZE)
+        if asset.key in self.__avatars:
+            self.__avatars.move_to_end(asset.key)
+            return self.__avatars[asset.key]
+        data = await asset.read()
+        image = await asyncio.to_thread(self.__prepare_avatar, data)
+        return self.__cache_avatar(asset.key, image)
+    
+    async def get_bot_avatar_image(self) -> Image.Image:
+        """Renvoie l'image utilisée pour les victoires des CPU"""
+        if 'bot_image' in self.__avatars:
+            self.__avatars.move_to_end('bot_image')
+            return self.__avatars['bot_image']
+        path = get_package_path('anarchy')
+        image = await asyncio.to_thread(self.__prepare_avatar, f"{path}/assets/bot_image.png")
+        return self.__cache_avatar('bot_image', image)
+    
+    async def generate_end_card_img(self, user_image: Image.Image, text: str) -> BytesIO:
+        """Génère la carte de fin de partie (hors de la boucle d'événements)
+
+        :param user_image: Avatar préparé avec `get_avatar_image()` ou `get_bot_avatar_image()`
+        :param text: Texte de la carte
+        :return: Image PNG
+        """
+        return await asyncio.to_thread(self.__render_end_card, user_image, text)
+    
+    def __render_end_card(self, userpfp: Image.Image, text: str) -> BytesIO:
         path = get_package_path('anarchy')
-        userpfp = user_image.resize((440, 440)).convert('RGBA')
-        userpfp = self.__add_corners(userpfp, 16)
-        
         imgdim = (500, 750)
         img = Image.new('RGB', imgdim, 'white')
         d = ImageDraw.Draw(img)
@@ -905,7 +1624,10 @@ class Anarchy(commands.GroupCog, name="anarchy", description="Jeu inspiré de Ca
         
         img.paste(userpfp, (30, 32), userpfp)
         img = self.__add_corners(img, 30)
-        return img
+        image_binary = BytesIO()
+        img.save(image_binary, 'PNG')
+        image_binary.seek(0)
+        return image_binary
     
     def _generate_white_card(self, text: str, horizontal: bool = True):
         path = get_package_path('anarchy')
@@ -965,35 +1687,56 @@ class Anarchy(commands.GroupCog, name="anarchy", description="Jeu inspiré de Ca
             
     @app_commands.command(name="start")
     @app_commands.guild_only()
-    async def start_classic(self, interaction: discord.Interaction, rounds: app_commands.Range[int, 3, 21] = 7):
+    async def start_classic(self, interaction: discord.Interaction, rounds: app_commands.Range[int, 3, 21] = 7, large: bool = False):
         """Lancer une partie de Anarchy avec les règles classique
 
         :param rounds: Nombre de tours de jeu, par défaut 7
+        :param large: Grand lobby (jusqu'à 500 joueurs, vote paginé), par défaut False
         """
         channel = interaction.channel
         author = interaction.user
         if channel.type not in [discord.ChannelType.text, discord.ChannelType.public_thread, discord.ChannelType.private_thread]: #type: ignore
             return await interaction.response.send_message('Cette commande ne peut être utilisée que dans un salon de texte', ephemeral=True)
-        if any([session.channel == channel for session in self.sessions]):
+        pacing = self.get_guild_settings(channel.guild).get('pacing', 'classic') #type: ignore
+        session = ClassicGame(self, channel, rounds, author, large, pacing=pacing) #type: ignore
+        self.stop_abandoned_sessions() # Une partie abandonnée ne doit pas bloquer le salon jusqu'au prochain nettoyage
+        if not self.sessions.register(channel.id, session): #type: ignore
             return await interaction.response.send_message('Une partie est déjà en cours dans ce salon', ephemeral=True)
-
-        session = ClassicGame(self, channel, rounds, author) #type: ignore
-        self.sessions.append(session)
         
         # Sélection des packs de cartes
         if not await session.select_cardpacks(interaction):
-            self.sessions.remove(session)
+            self.sessions.remove(channel.id, session) #type: ignore
             return await interaction.followup.send("**Partie annulée ·** Aucun pack de cartes n'a été sélectionné", ephemeral=True)
         
         # Enregistrement des joueurs
         session.add_player(HumanPlayer(author))
         if not await session.register_players():
-            self.sessions.remove(session)
+            self.sessions.remove(channel.id, session) #type: ignore
             return await interaction.followup.send("**Partie annulée ·** Il n'y a pas assez de joueurs pour commencer la partie")
         
         # Lancement de la partie
-        await session.start_game()
-        self.sessions.remove(session)
+        session.task = asyncio.create_task(self.run_session(session))
+        logger.info(f"Partie lancée dans le salon {channel.id} ({len(self.sessions)} parties en cours)")
+        
+    @app_commands.command(name="pacing")
+    @app_commands.guild_only()
+    @app_commands.checks.has_permissions(manage_messages=True)
+    @app_commands.choices(profile=[
+        app_commands.Choice(name="Classique", value='classic'),
+        app_commands.Choice(name="Rapide", value='fast'),
+        app_commands.Choice(name="Tournoi (plus de temps pour jouer et voter)", value='tournament'),
+        app_commands.Choice(name="Turbo (aucune pause quand tout le monde a joué)", value='turbo')
+    ])
+    async def set_pacing(self, interaction: discord.Interaction, profile: str):
+        """Régler le rythme des prochaines parties d'Anarchy sur ce serveur
+
+        :param profile: Rythme des parties
+        """
+        guild = interaction.guild
+        if not isinstance(guild, discord.Guild):
+            return await interaction.response.send_message('Cette commande ne peut être utilisée que dans un serveur', ephemeral=True)
+        self.set_guild_settings(guild, {'pacing': profile})
+        await interaction.response.send_message(f"**Succès ·** Les prochaines parties se joueront au rythme `{profile}`", ephemeral=True)
         
     @app_commands.command(name="scoreboard")
     @app_commands.guild_only()
@@ -1004,14 +1747,14 @@ class Anarchy(commands.GroupCog, name="anarchy", description="Jeu inspiré de Ca
         guild = interaction.guild
         if not isinstance(guild, discord.Guild):
             return await interaction.response.send_message('Cette commande ne peut être utilisée que dans un serveur', ephemeral=True)
-        data = self.get_players_scores(guild) 
+        data = self.get_players_scores(guild, limit=top)
         if not data:
             return await interaction.response.send_message("**Erreur ·** Aucun joueur humain n'a encore remporté une partie à Anarchy", ephemeral=True)
         
-        
-        scoreboard = [(guild.get_member(user_id).name if guild.get_member(user_id) else user_id, score) for user_id, score in data][:top] #type: ignore
+        members = {user_id: guild.get_member(user_id) for user_id, _ in data}
+        scoreboard = [(members[user_id].name if members[user_id] else user_id, score) for user_id, score in data] #type: ignore
         em = discord.Embed(title="**Anarchy ·** Scoreboard", color=discord.Color.blurple())
-        em.description = pretty.codeblock(tabulate(scoreboard, headers=['Joueur', 'Score']))
+        em.description = pretty.table_pages(scoreboard, headers=['Joueur', 'Score'])[0]
         em.set_footer(text=f"Top {top} • Chaque partie gagnée rapporte 1 point")
         await interaction.response.send_message(embed=em)
         
@@ -4,15 +4,15 @@ import logging
 import time
 from collections import namedtuple
 from datetime import datetime
-from typing import Callable, List, Optional
+from typing import Callable, List, Optional, Tuple
 
 import discord
 from discord import app_commands
 from discord.ext import commands
-from tabulate import tabulate
 
 from common.dataio import get_sqlite_database
-from common.utils import fuzzy, pretty
+from common.utils import pretty
+from common.utils.autocomplete import AutocompleteCache
 
 logger = logging.getLogger('ctrlalt.Economy')
 
@@ -65,24 +65,15 @@ class TransactionsHistoryView(discord.ui.View):
         await self.message.edit(view=self.clear_items())
         
     def create_pages(self):
+        tabl = [(f"{trs.ftime} {trs.fdate}", f"{trs.delta:+}", f"{pretty.troncate_text(trs.message, 50)}") for trs in self.transactions]
+        if not tabl:
+            return []
         embeds = []
-        tabl = []
-        for trs in self.transactions:
-            if len(tabl) < 20:
-                tabl.append((f"{trs.ftime} {trs.fdate}", f"{trs.delta:+}", f"{pretty.troncate_text(trs.message, 50)}"))
-            else:
-                em = discord.Embed(color=0x2F3136, description=pretty.codeblock(tabulate(tabl, headers=("Date", "Delta", "Message"))))
-                em.set_author(name=f"Historique des transactions · {self.member}", icon_url=self.member.display_avatar.url)
-                em.set_footer(text=f"{len(self.transactions)} transactions enregistrées dans les {int(TRANSACTION_EXPIRATION_DELAY / 86400)} derniers jours")
-                embeds.append(em)
-                tabl = []
-        
-        if tabl:
-            em = discord.Embed(color=0x2F3136, description=pretty.codeblock(tabulate(tabl, headers=("Date", "Delta", "Message")))) 
+        for page in pretty.table_pages(tabl, headers=("Date", "Delta", "Message"), max_rows=20):
+            em = discord.Embed(color=0x2F3136, description=page)
             em.set_author(name=f"Historique des transactions · {self.member}", icon_url=self.member.display_avatar.url)
             em.set_footer(text=f"{len(self.transactions)} transactions enregistrées dans les {int(TRANSACTION_EXPIRATION_DELAY / 86400)} derniers jours")
             embeds.append(em)
-            
         return embeds
     
     async def start(self):
@@ -327,6 +318,7 @@ class Economy(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
         self.last_cleanup : float = 0.0
+        self.autocomplete = AutocompleteCache()
         
         self.context_menu = app_commands.ContextMenu(
             name='Compte Bancaire',
@@ -413,6 +405,7 @@ class Economy(commands.Cog):
         conn.commit()
         cursor.close()
         conn.close()
+        self.autocomplete.invalidate(guild.id, 'bankset')
         
         
     def guild_currency(self, guild: discord.Guild) -> str:
@@ -594,6 +587,27 @@ class Economy(commands.Cog):
         conn.close()
 
 
+    def claim_daily_allowance(self, member: discord.Member, day: Optional[str] = None) -> Tuple[str, int]:
+        """Verse au membre son allocation journalière s'il y a droit
+
+        :param member: Membre demandant son allocation
+        :param day: Jour de la demande (JJ/MM/AAAA), par défaut aujourd'hui
+        :return: Statut ('paid' si versée, 'limit' si le solde dépasse la limite, 'claimed' si déjà perçue ce jour) et montant versé ou limite dépassée
+        """
+        settings = self.get_guild_settings(member.guild)
+        account = self.get_account(member)
+        day = day or datetime.now().strftime('%d/%m/%Y')
+        
+        if account.balance >= int(settings['limitAllowance']):
+            return 'limit', int(settings['limitAllowance'])
+        if self.check_rule(member.guild, f'{member.id}@dailyAllowance', lambda x: x == day):
+            return 'claimed', 0
+        
+        account.deposit_credits(int(settings['dailyAllowance']), "Allocation d'aide journalière").save()
+        self.set_rule(member.guild, f'{member.id}@dailyAllowance', day)
+        return 'paid', int(settings['dailyAllowance'])
+
+
     # COMMANDES ======================================================================
     
     @app_commands.command(name='account')
@@ -656,20 +670,13 @@ class Economy(commands.Cog):
     @app_commands.guild_only
     async def get_daily_allowance(self, interaction: discord.Interaction):
         """Récupérer son allocation journalière définie par la banque (pour les membres les plus précaires)"""
-        settings = self.get_guild_settings(interaction.guild)
-        account = self.get_account(interaction.user)
         currency = self.guild_currency(interaction.guild)
-        today = datetime.now().strftime('%d/%m/%Y')
-        
-        if account.balance >= int(settings['limitAllowance']):
-            return await interaction.response.send_message(f"**Allocation non versée ·** Votre solde est au delà de la limite imposée par la banque ({pretty.humanize_number(settings['limitAllowance'])}{currency}).", ephemeral=True)
-        
-        if self.check_rule(interaction.guild, f'{interaction.user.id}@dailyAllowance', lambda x: x == today):
+        status, amount = self.claim_daily_allowance(interaction.user)
+        if status == 'limit':
+            return await interaction.response.send_message(f"**Allocation non versée ·** Votre solde est au delà de la limite imposée par la banque ({pretty.humanize_number(amount)}{currency}).", ephemeral=True)
+        if status == 'claimed':
             return await interaction.response.send_message(f"**Allocation non versée ·** Vous avez déjà perçu votre allocation pour aujourd'hui.", ephemeral=True)
-        
-        account.deposit_credits(int(settings['dailyAllowance']), "Allocation d'aide journalière").save()
-        self.set_rule(interaction.guild, f'{interaction.user.id}@dailyAllowance', today)
-        await interaction.response.send_message(f"**Allocation versée ·** Vous avez reçu **{pretty.humanize_number(int(settings['dailyAllowance']))}{currency}**\nVous avez désormais {account}")
+        await interaction.response.send_message(f"**Allocation versée ·** Vous avez reçu **{pretty.humanize_number(amount)}{currency}**\nVous avez désormais {self.get_account(interaction.user)}")
            
     @app_commands.command(name='leaderboard')
     @app_commands.guild_only
@@ -687,7 +694,7 @@ class Economy(commands.Cog):
             rank += 1
         if not chunks:
             return await interaction.response.send_message(f"**Erreur ·** Il m'est impossible de générer un leaderboard sur ce serveur", ephemeral=True)
-        em = discord.Embed(color=0x2F3136, title=f"**Leaderboard** · {interaction.guild.name}", description=pretty.codeblock(tabulate(chunks, headers=('#', 'Membre', 'Solde')), lang='css')) #type: ignore
+        em = discord.Embed(color=0x2F3136, title=f"**Leaderboard** · {interaction.guild.name}", description=pretty.table_pages(chunks, headers=('#', 'Membre', 'Solde'), lang='css')[0]) #type: ignore
         em.set_footer(text=f"Crédits en circulation : {pretty.humanize_number(self.guild_total_credits(interaction.guild))}{currency}")
         await interaction.response.send_message(embed=em)
         
@@ -712,8 +719,8 @@ class Economy(commands.Cog):
         
     @set_bank_settings.autocomplete('setting')
     async def autocomplete_callback(self, interaction: discord.Interaction, current: str):
-        banksettings = tuple(self.get_guild_settings(interaction.guild).items())
-        stgs = fuzzy.finder(current, banksettings, key=lambda bs: bs[0])
+        guild = interaction.guild
+        stgs = await self.autocomplete.search((guild.id, 'bankset', 'setting'), current, lambda: tuple(self.get_guild_settings(guild).items()), key=lambda bs: bs[0])
         return [app_commands.Choice(name=f'{s[0]} ({s[1]})', value=s[0]) for s in stgs]
     
     @app_commands.command(name="setbalance")
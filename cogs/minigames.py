@@ -1,21 +1,49 @@
 # pyright: reportGeneralTypeIssues=false
 
 import asyncio
+import json
 import logging
+import math
 import random
 import time
+from collections import namedtuple
 from datetime import datetime
-from typing import List
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
 
 import discord
+import numpy as np
 from discord import app_commands
 from discord.ext import commands
 
 from cogs.economy import Economy
+from common.dataio import get_sqlite_database
+from common.sessions import SessionRegistry
 from common.utils import pretty
+from common.utils.ratelimit import GameBoard
 
 logger = logging.getLogger('ctrlalt.MiniGames')
 
+ROULETTE_SESSION_TTL = 600 # Durée max. sans activité d'une partie de roulette russe (en secondes)
+ROULETTE_MAX_PLAYERS = 6
+ROULETTE_LOBBY_DELAY = 60 # Durée d'ouverture du lobby (en secondes)
+
+SLOT_STRIP = ['🍀', '🍎', '🍊', '🪙', '🍇'] # Bande (circulaire) de chaque rouleau
+SLOT_OFFSETS = (-1, 0, 1) # Décalages possibles d'un rouleau par rapport au précédent
+SLOT_PAYTABLE = { # Gain pour trois symboles identiques : multiplicateur de la mise, bonus fixe
+    '🍎': (1, 100),
+    '🍊': (1, 100),
+    '🍇': (1, 100),
+    '🍀': (4, 0),
+    '🪙': (6, 0)
+}
+SLOT_SYMBOL_NAMES = {'🍎': 'Fruit', '🍊': 'Fruit', '🍇': 'Fruit', '🍀': 'Trèfle', '🪙': "Pièce d'or"}
+SLOT_SIMULATION_SPINS = 200000 # Tours simulés pour estimer le taux de redistribution d'un réglage
+
+DEFAULT_SETTINGS = [
+    ('slotStrip', SLOT_STRIP),
+    ('slotPaytable', SLOT_PAYTABLE)
+]
+
 RUSSIAN_KILL_COM = [
     "Finalement {0} en avait dans la cervelle !",
     "Maintenant que {0} est parti·e on peut arrêter de jouer ! Non ? D'accord, très bien !",
@@ -80,12 +108,242 @@ RUSSIAN_KILL_COM = [
     "Je suis sûr que {0} a fait un pacte avec le diable."
     ]
 
+RouletteEvent = namedtuple('RouletteEvent', ('type', 'round', 'player_id'))
+
+class RussianRoulette:
+    """Partie de roulette russe, sans affichage ni attente
+
+    À chaque round, une balle est placée dans le barillet et les survivants tirent à tour de rôle, dans un ordre tiré au hasard, jusqu'à ce que l'un d'eux meure.
+    Le déroulement est produit sous forme d'événements ('round', 'click', 'bang' puis 'win' pour le dernier survivant) que l'appelant raconte comme il l'entend.
+    """
+    def __init__(self, bets: Dict[int, int], chambers: int = 6, rng: Optional[random.Random] = None) -> None:
+        if len(bets) < 2:
+            raise ValueError("Il faut au moins deux joueurs pour jouer à la roulette russe")
+        self.bets = dict(bets)
+        self.chambers = chambers
+        self.rng = rng or random.Random()
+        self.alive : List[int] = list(bets)
+        self.round = 0
+        self.paid = False # Mises versées au gagnant
+        
+    @property
+    def pot(self) -> int:
+        """Total des mises, remporté par le dernier survivant"""
+        return sum(self.bets.values())
+    
+    @property
+    def winner(self) -> Optional[int]:
+        return self.alive[0] if len(self.alive) == 1 else None
+        
+    def play_round(self) -> List[RouletteEvent]:
+        """Joue un round complet et renvoie ses événements (aucun si la partie est terminée)"""
+        if self.winner is not None:
+            return []
+        self.round += 1
+        order = self.alive[:]
+        self.rng.shuffle(order)
+        # Tirer la détente jusqu'à la balle revient à tirer au hasard la position de la balle dans le barillet
+        shot = self.rng.randrange(self.chambers)
+        events = [RouletteEvent('round', self.round, None)]
+        events.extend(RouletteEvent('click', self.round, order[turn % len(order)]) for turn in range(shot))
+        victim = order[shot % len(order)]
+        self.alive.remove(victim)
+        events.append(RouletteEvent('bang', self.round, victim))
+        if self.winner is not None:
+            events.append(RouletteEvent('win', self.round, self.winner))
+        return events
+    
+    def play(self) -> Iterator[RouletteEvent]:
+        """Joue la partie jusqu'au bout"""
+        while self.winner is None:
+            yield from self.play_round()
+
+
+SlotStats = namedtuple('SlotStats', ('spins', 'rtp', 'hit_rate', 'volatility'))
+
+class SlotMachine:
+    """Machine à sous à rouleaux identiques
+
+    Chaque rouleau est une bande circulaire de symboles : le premier s'arrête sur une position au hasard, chacun des suivants à une position voisine (voir `offsets`) de celle du précédent.
+    Des symboles tous identiques sur la ligne centrale rapportent `multiplicateur x mise + bonus` selon la table des gains, sinon la mise est perdue.
+    """
+    def __init__(self, strip: Sequence[str] = SLOT_STRIP, paytable: Dict[str, Sequence[int]] = SLOT_PAYTABLE, offsets: Sequence[int] = SLOT_OFFSETS, reels: int = 3) -> None:
+        if not strip or not offsets or reels < 1:
+            raise ValueError("La bande, les décalages et le nombre de rouleaux ne peuvent pas être vides")
+        self.strip = list(strip)
+        self.paytable = {symbol: (int(multiplier), int(bonus)) for symbol, (multiplier, bonus) in paytable.items()}
+        self.offsets = np.array(offsets, dtype=np.int64)
+        self.reels = reels
+        
+        symbols = list(dict.fromkeys(self.strip))
+        self._symbols = np.array([symbols.index(s) for s in self.strip]) # Symbole de chaque position de la bande
+        self._multipliers = np.array([self.paytable.get(s, (0, 0))[0] for s in symbols], dtype=np.int64)
+        self._bonuses = np.array([self.paytable.get(s, (0, 0))[1] for s in symbols], dtype=np.int64)
+        
+    @classmethod
+    def from_settings(cls, settings: dict) -> 'SlotMachine':
+        return cls(settings.get('slotStrip', SLOT_STRIP), settings.get('slotPaytable', SLOT_PAYTABLE))
+    
+    def spin_many(self, rng: np.random.Generator, count: int) -> np.ndarray:
+        """Fait tourner la machine `count` fois
+
+        :param rng: Générateur aléatoire
+        :param count: Nombre de tours
+        :return: Positions centrales des rouleaux, une ligne par tour
+        """
+        first = rng.integers(len(self.strip), size=(count, 1))
+        steps = rng.choice(self.offsets, size=(count, self.reels - 1))
+        return np.cumsum(np.concatenate((first, steps), axis=1), axis=1) % len(self.strip)
+    
+    def spin(self, rng: np.random.Generator) -> List[int]:
+        return self.spin_many(rng, 1)[0].tolist()
+    
+    def columns(self, positions: Sequence[int]) -> List[Tuple[str, str, str]]:
+        """Symboles visibles (haut, centre, bas) de chaque rouleau"""
+        size = len(self.strip)
+        return [(self.strip[(p - 1) % size], self.strip[p], self.strip[(p + 1) % size]) for p in positions]
+    
+    def payout(self, positions: Sequence[int], bet: int) -> Tuple[int, Optional[str]]:
+        """Renvoie le gain d'un tour (0 si perdu) et le symbole gagnant"""
+        centers = {self.strip[p] for p in positions}
+        if len(centers) != 1:
+            return 0, None
+        symbol = centers.pop()
+        multiplier, bonus = self.paytable.get(symbol, (0, 0))
+        credits = multiplier * bet + bonus
+        return (credits, symbol) if credits > 0 else (0, None)
+    
+    def net(self, positions: np.ndarray, bet: int) -> np.ndarray:
+        """Variation du solde du joueur pour chaque tour (gain, ou perte de la mise)"""
+        ids = self._symbols[positions]
+        win = (ids == ids[:, :1]).all(axis=1)
+        credits = self._multipliers[ids[:, 0]] * bet + self._bonuses[ids[:, 0]]
+        return np.where(win & (credits > 0), credits, -bet)
+    
+    def simulate(self, bet: int, spins: int = 1000000, seed: Optional[int] = None, batch: int = 1000000) -> SlotStats:
+        """Simule un grand nombre de tours pour estimer le comportement de la machine
+
+        :param bet: Mise de chaque tour
+        :param spins: Nombre de tours simulés
+        :param seed: Graine du générateur aléatoire
+        :param batch: Nombre de tours simulés à la fois (limite la mémoire utilisée)
+        :return: Taux de redistribution (mises rendues / mises engagées), taux de tours gagnants et volatilité (écart-type d'un tour rapporté à la mise)
+        """
+        rng = np.random.default_rng(seed)
+        total = total_sq = hits = done = 0
+        while done < spins:
+            count = min(batch, spins - done)
+            net = self.net(self.spin_many(rng, count), bet)
+            total += int(net.sum())
+            total_sq += float(np.square(net, dtype=np.float64).sum())
+            hits += int((net > 0).sum())
+            done += count
+        mean = total / spins
+        return SlotStats(spins, 1 + mean / bet, hits / spins, math.sqrt(max(total_sq / spins - mean ** 2, 0)) / bet)
+    
+    def describe(self, currency: str) -> str:
+        """Tableau des gains, les symboles rapportant autant étant regroupés"""
+        groups : Dict[Tuple[int, int], List[str]] = {}
+        for symbol in dict.fromkeys(self.strip):
+            if sum(self.paytable.get(symbol, (0, 0))):
+                groups.setdefault(self.paytable[symbol], []).append(symbol)
+        lines = []
+        for (multiplier, bonus), symbols in groups.items():
+            parts = ['Offre'] if multiplier else []
+            if multiplier > 1:
+                parts.append(f'{multiplier - 1}x Offre')
+            if bonus:
+                parts.append(f'{bonus}{currency}')
+            names = dict.fromkeys(SLOT_SYMBOL_NAMES.get(s, s) for s in symbols)
+            lines.append(f"{' '.join(symbols)} {'/'.join(names)} = {' + '.join(parts)}")
+        return '\n'.join(lines)
+
+
 class MiniGames(commands.GroupCog, group_name="minigame", description="Mini-jeux exploitant l'économie du bot"):
     """Mini-jeux divers et variés"""
 
     def __init__(self, bot: commands.Bot):
         self.bot = bot
-        self.roulette = {}
+        self.roulette : SessionRegistry[dict] = SessionRegistry(ttl=ROULETTE_SESSION_TTL)
+        self.rng = np.random.default_rng()
+        self.__slot_machines : Dict[int, SlotMachine] = {}
+        
+    async def cog_unload(self) -> None:
+        for game in self.roulette:
+            if game.get('task'):
+                game['task'].cancel()
+        
+    @commands.Cog.listener()
+    async def on_ready(self):
+        self._initialize_database()
+        
+    @commands.Cog.listener()
+    async def on_guild_join(self, guild: discord.Guild):
+        self._initialize_database()
+        
+    def _initialize_database(self):
+        for guild in self.bot.guilds:
+            conn = get_sqlite_database('minigames', 'g' + str(guild.id))
+            cursor = conn.cursor()
+            cursor.execute("CREATE TABLE IF NOT EXISTS settings (setting_name TINYTEXT PRIMARY KEY, value TEXT)")
+            for name, default_value in DEFAULT_SETTINGS:
+                cursor.execute("INSERT OR IGNORE INTO settings (setting_name, value) VALUES (?, ?)", (name, json.dumps(default_value)))
+            conn.commit()
+            cursor.close()
+            conn.close()
+            
+    def get_guild_settings(self, guild: discord.Guild) -> dict:
+        """Obtenir les paramètres des mini-jeux du serveur
+
+        :param guild: Serveur des paramètres à récupérer
+        :return: dict
+        """
+        conn = get_sqlite_database('minigames', 'g' + str(guild.id))
+        cursor = conn.cursor()
+        cursor.execute("SELECT * FROM settings")
+        settings = cursor.fetchall()
+        cursor.close()
+        conn.close()
+        return {s[0] : json.loads(s[1]) for s in settings}
+    
+    def set_guild_settings(self, guild: discord.Guild, update: dict):
+        """Met à jour les paramètres des mini-jeux du serveur
+
+        :param guild: Serveur à mettre à jour
+        :param update: Paramètres à mettre à jour (toutes les valeurs seront automatiquement sérialisées en JSON)
+        """
+        conn = get_sqlite_database('minigames', 'g' + str(guild.id))
+        cursor = conn.cursor()
+        for name, value in update.items():
+            cursor.execute("INSERT OR REPLACE INTO settings (setting_name, value) VALUES (?, ?)", (name, json.dumps(value)))
+        conn.commit()
+        cursor.close()
+        conn.close()
+        self.__slot_machines.pop(guild.id, None)
+        
+    def get_slot_machine(self, guild: discord.Guild) -> SlotMachine:
+        """Renvoie la machine à sous configurée pour le serveur"""
+        if guild.id not in self.__slot_machines:
+            self.__slot_machines[guild.id] = SlotMachine.from_settings(self.get_guild_settings(guild))
+        return self.__slot_machines[guild.id]
+        
+    def spin_slot_machine(self, member: discord.Member, bet: int, machine: Optional[SlotMachine] = None) -> Tuple[List[int], int, Optional[str]]:
+        """Fait jouer le membre à la machine à sous et règle le tour sur son compte (le solde doit couvrir la mise)
+
+        :param member: Joueur
+        :param bet: Mise
+        :param machine: Machine utilisée, par défaut celle du serveur
+        :return: Positions des rouleaux, gain (0 si la mise est perdue) et symbole gagnant
+        """
+        machine = machine or self.get_slot_machine(member.guild)
+        account = self.bot.get_cog('Economy').get_account(member)
+        positions = machine.spin(self.rng)
+        credits, symbol = machine.payout(positions, bet)
+        if credits:
+            account.deposit_credits(credits, "Gain à la machine à sous").save()
+        else:
+            account.withdraw_credits(bet, "Perte à la machine à sous").save()
+        return positions, credits, symbol
         
     @app_commands.command(name="slot")
     @app_commands.checks.cooldown(5, 60)
@@ -97,8 +355,9 @@ class MiniGames(commands.GroupCog, group_name="minigame", description="Mini-jeux
         member = interaction.user
         bank : Economy = self.bot.get_cog('Economy')
         currency = bank.guild_currency(interaction.guild)
+        machine = self.get_slot_machine(interaction.guild)
         if not bet:
-            em = discord.Embed(title="Tableau des gains", description="```Fruit = Offre + 100{}\nTrèfle = Offre + 3x Offre\nPièce = Offre + 5x Offre```".format(currency), color=0x2F3136)
+            em = discord.Embed(title="Tableau des gains", description=pretty.codeblock(machine.describe(currency)), color=0x2F3136)
             em.set_footer(text="Vous êtes toujours remboursé lorsque vous gagnez.")
             return await interaction.response.send_message(embed=em)
         
@@ -106,50 +365,74 @@ class MiniGames(commands.GroupCog, group_name="minigame", description="Mini-jeux
         if account.balance < bet:
             return await interaction.response.send_message(f"**Solde insuffisant ·** Vous n'avez pas {bet}{currency} sur votre compte")
         
-        await interaction.response.defer()
-        await asyncio.sleep(1)
-        symbols = ['🍎', '🍊', '🪙', '🍇', '🍀']
-        wheel = ['🍀', '🍎', '🍊', '🪙', '🍇', '🍀', '🍎']
-        def _column(previous_center=None):
-            if previous_center:
-                pv_index = wheel.index(previous_center)
-                center = random.choice([wheel[pv_index - 1], wheel[pv_index], wheel[pv_index + 1]])
-            else:
-                center = random.choice(symbols)
-            top, bottom = wheel[symbols.index(center) + 2], wheel[symbols.index(center)]
-            return top, center, bottom
-        
-        cola = _column()
-        colb = _column(cola[1])
-        colc = _column(colb[1])
-        columns = [cola, colb, colc]
-        center_row = [columns[0][1], columns[1][1], columns[2][1]]
-        if center_row[0] == center_row[1] == center_row[2]:
-            if center_row[0] in ['🍎', '🍊', '🍇', ]:
-                credits = bet + 100
-                wintxt = "3x Fruit !"
-            elif center_row[0] == '🍀':
-                credits = bet + (bet * 3)
-                wintxt = "3x Trèfle !"
-            else:
-                credits = bet + (bet * 5)
-                wintxt = "3x Pièce d'or !"
-        else:
-            credits = 0
-            wintxt = ''
+        positions, credits, symbol = self.spin_slot_machine(member, bet, machine)
+        columns = machine.columns(positions)
         
         txt = f"┇{columns[0][0]}┋{columns[1][0]}┋{columns[2][0]}┇\n"
         txt += f"▸{columns[0][1]}▪{columns[1][1]}▪{columns[2][1]}◂\n"
         txt += f"┇{columns[0][2]}┋{columns[1][2]}┋{columns[2][2]}┇"
         em = discord.Embed(color=0x2F3136, description=pretty.codeblock(txt, 'fix'), title=f'**Machine à sous** | `Mise : {bet}{currency}`')
         if credits:
-            em.set_footer(text=f"{wintxt}\nVous gagnez {pretty.humanize_number(credits)}{currency}")
-            account.deposit_credits(credits, "Gain à la machine à sous").save()
+            em.set_footer(text=f"{machine.reels}x {SLOT_SYMBOL_NAMES.get(symbol, symbol)} !\nVous gagnez {pretty.humanize_number(credits)}{currency}")
         else:
             em.set_footer(text=f"Vous perdez votre mise ({pretty.humanize_number(bet)}{currency})")
-            account.withdraw_credits(bet, "Perte à la machine à sous").save()
-        await interaction.followup.send(embed=em)
+        await interaction.response.send_message(embed=em)
+        
+    @app_commands.command(name="slotset")
+    @app_commands.guild_only
+    @app_commands.checks.has_permissions(manage_messages=True)
+    @app_commands.choices(setting=[app_commands.Choice(name='Bande des rouleaux', value='slotStrip'), app_commands.Choice(name='Table des gains', value='slotPaytable')])
+    async def set_slot_machine(self, interaction: discord.Interaction, setting: str, value: str):
+        """Régler la machine à sous du serveur (le taux de redistribution obtenu est affiché)
+
+        :param setting: Paramètre à modifier
+        :param value: Valeur en JSON, ex. ["🍀", "🍎", "🪙"] pour la bande ou {"🍀": [4, 0], "🪙": [6, 0]} pour la table des gains (multiplicateur de la mise, bonus)
+        """
+        try:
+            parsed = json.loads(value)
+            settings = self.get_guild_settings(interaction.guild)
+            settings[setting] = parsed
+            machine = SlotMachine.from_settings(settings)
+        except (ValueError, TypeError, AttributeError):
+            return await interaction.response.send_message(f"**Erreur ·** La valeur donnée n'est pas valide pour ce paramètre", ephemeral=True)
+        
+        await interaction.response.defer(ephemeral=True)
+        stats = await asyncio.to_thread(machine.simulate, 100, SLOT_SIMULATION_SPINS)
+        self.set_guild_settings(interaction.guild, {setting: parsed})
+        await interaction.followup.send(f"**Succès ·** La machine à sous a été réglée\nRedistribution : **{stats.rtp:.1%}** · Tours gagnants : **{stats.hit_rate:.1%}** · Volatilité : **{stats.volatility:.2f}** (mise de 100, {pretty.humanize_number(stats.spins)} tours simulés)", ephemeral=True)
         
+    def pay_russian_roulette(self, guild: discord.Guild, game: RussianRoulette) -> discord.Member:
+        """Verse la totalité des mises au gagnant de la partie
+
+        :param guild: Serveur de la partie
+        :param game: Partie terminée
+        :return: Le gagnant
+        """
+        winner = guild.get_member(game.winner)
+        if not winner:
+            raise ValueError(f"Le gagnant USER_ID={game.winner} n'est plus sur le serveur")
+        self.bot.get_cog('Economy').get_account(winner).deposit_credits(game.pot, "Gain roulette russe").save()
+        game.paid = True
+        return winner
+    
+    def refund_russian_roulette(self, guild: discord.Guild, game: dict) -> None:
+        """Rembourse les mises d'une partie interrompue, sauf si le gagnant a déjà été payé ou les joueurs remboursés
+
+        :param guild: Serveur de la partie
+        :param game: Lobby de la partie
+        """
+        roulette : Optional[RussianRoulette] = game.get('roulette')
+        if game.get('refunded') or (roulette and roulette.paid):
+            return
+        game['refunded'] = True
+        bank : Economy = self.bot.get_cog('Economy')
+        for member_id, bet in game['players'].items():
+            member = guild.get_member(member_id)
+            if not member:
+                logger.warning(f"Mise de {bet} non remboursée : le joueur USER_ID={member_id} n'est plus sur le serveur")
+                continue
+            bank.get_account(member).deposit_credits(bet, "Remboursement mise roulette russe").save()
+    
     @app_commands.command(name="russian")
     async def russian_roulette(self, interaction: discord.Interaction, bet: app_commands.Range[int, 20, 100]):
         """Jouer à la roulette russe (jusqu'à 6 joueurs)
@@ -160,20 +443,17 @@ class MiniGames(commands.GroupCog, group_name="minigame", description="Mini-jeux
         guild : discord.Guild = interaction.guild
         bank : Economy = self.bot.get_cog('Economy')
         currency = bank.guild_currency(guild)
-        default_cache = {
-            'open': False,
-            'playing': False,
-            'players': {},
-            'minimal_bet': 20
-            }
-        if not self.roulette.get(channel.id, {}):
-            self.roulette[channel.id] = default_cache
-            
-        if self.roulette[channel.id]['playing']:
-            return await interaction.response.send_message(f"**Partie en cours ·** Il y a déjà une partie en cours sur ce salon, attendez qu'elle se termine !", ephemeral=True)
-        
         user_account = bank.get_account(interaction.user)
-        if not self.roulette[channel.id]['open']:
+        async with self.roulette.lock(channel.id):
+            for abandoned in self.roulette.cleanup():
+                if abandoned.get('task'):
+                    abandoned['task'].cancel()
+            game = self.roulette.get(channel.id)
+            if game and game['playing']:
+                return await interaction.response.send_message(f"**Partie en cours ·** Il y a déjà une partie en cours sur ce salon, attendez qu'elle se termine !", ephemeral=True)
+            if game:
+                return await self.join_russian_roulette(interaction, game, bet)
+            
             if user_account.balance < bet:
                 return await interaction.response.send_message(f"**Solde insuffisant ·** Vous n'avez pas {bet}{currency} sur votre compte !", ephemeral=True)
             try:
@@ -181,33 +461,75 @@ class MiniGames(commands.GroupCog, group_name="minigame", description="Mini-jeux
                 first_trs.save()
             except:
                 return await interaction.response.send_message(f"**Transaction impossible ·** Il y a eu un problème lors du retrait de votre mise de votre compte.", ephemeral=True)
-            self.roulette[channel.id]['minimal_bet'] = bet
-            self.roulette[channel.id]['players'][interaction.user.id] = {'bet': bet, 'alive': True}
-            self.roulette[channel.id]['open'] = True
-            await interaction.response.send_message(f"**Roulette russe ·** Un lobby a été ouvert par **{interaction.user.name}** avec une mise minimale de **{bet}**{currency}\nRejoignez vite la partie avec </minigame russian:1056026048342528080> ! (max. 6 joueurs)")
+            game = {
+                'open': True,
+                'playing': False,
+                'players': {interaction.user.id: bet},
+                'minimal_bet': bet
+                }
+            self.roulette.register(channel.id, game)
+            # La partie se déroule hors du gestionnaire de l'interaction, et rembourse l'hôte si personne ne rejoint (même si l'annonce échoue)
+            game['task'] = asyncio.create_task(self.run_russian_roulette(channel, interaction.user, game, first_trs))
+        
+        await interaction.response.send_message(f"**Roulette russe ·** Un lobby a été ouvert par **{interaction.user.name}** avec une mise minimale de **{bet}**{currency}\nRejoignez vite la partie avec </minigame russian:1056026048342528080> ! (max. {ROULETTE_MAX_PLAYERS} joueurs)")
             
-            timeout = int(time.time() + 60)
-            while time.time() < timeout and len(list(self.roulette[channel.id]['players'].keys())) < 6:
+    async def join_russian_roulette(self, interaction: discord.Interaction, game: dict, bet: int):
+        """Fait rejoindre le lobby de roulette russe ouvert sur le salon"""
+        bank : Economy = self.bot.get_cog('Economy')
+        currency = bank.guild_currency(interaction.guild)
+        user_account = bank.get_account(interaction.user)
+        if interaction.user.id in game['players']:
+            return await interaction.response.send_message(f"**Déjà inscrit·e ·** Vous faites déjà partie de ce lobby !", ephemeral=True)
+        if len(game['players']) >= ROULETTE_MAX_PLAYERS:
+            return await interaction.response.send_message(f"**Lobby plein ·** Il y a déjà {ROULETTE_MAX_PLAYERS} joueurs dans le lobby !", ephemeral=True)
+        if bet < game['minimal_bet']:
+            return await interaction.response.send_message(f"**Mise insuffisante ·** Vous ne pouvez pas miser moins que le créateur du lobby, c'est-à-dire {game['minimal_bet']}{currency} !", ephemeral=True)
+        if user_account.balance < bet:
+            return await interaction.response.send_message(f"**Solde insuffisant ·** Vous n'avez pas {bet}{currency} sur votre compte !", ephemeral=True)
+        try:
+            user_account.withdraw_credits(bet, 'Mise roulette russe').save()
+        except:
+            return await interaction.response.send_message(f"**Transaction impossible ·** Il y a eu un problème lors du retrait de votre mise de votre compte", ephemeral=True)
+        game['players'][interaction.user.id] = bet
+        self.roulette.touch(interaction.channel_id)
+        await interaction.response.send_message(f"**Nouveau joueur ·** ***{interaction.user.name}*** a rejoint la partie avec une mise de **{bet}**{currency} !")
+        
+    async def run_russian_roulette(self, channel: discord.TextChannel, host: discord.Member, game: dict, first_trs):
+        """Attend les joueurs du lobby puis déroule et raconte la partie"""
+        try:
+            timeout = time.time() + ROULETTE_LOBBY_DELAY
+            while time.time() < timeout and len(game['players']) < ROULETTE_MAX_PLAYERS:
                 await asyncio.sleep(0.5)
-            self.roulette[channel.id]['open'] = False
-            if len(self.roulette[channel.id]['players'].keys()) < 2:
-                user_account.cancel_transaction(first_trs, "Remboursement mise roulette russe").save()
-                return await channel.send(f"**Roulette russe annulée ·** Partie annulée en raison du manque de joueurs\n{interaction.user.mention} a été remboursé de sa mise.")
-            await channel.send(f"**Fermeture du lobby ·** La partie va bientôt commencer !")
+            async with self.roulette.lock(channel.id):
+                game['open'] = False
+                if len(game['players']) < 2:
+                    self.bot.get_cog('Economy').get_account(host).cancel_transaction(first_trs, "Remboursement mise roulette russe").save()
+                    game['refunded'] = True
+                    return await channel.send(f"**Roulette russe annulée ·** Partie annulée en raison du manque de joueurs\n{host.mention} a été remboursé de sa mise.")
+                game['playing'] = True
             
-        else:
-            if len(self.roulette[channel.id]['players'].keys()) >= 6:
-                return await interaction.response.send_message(f"**Lobby plein ·** Il y a déjà 6 joueurs dans le lobby !", ephemeral=True)
-            if bet < self.roulette[channel.id]['minimal_bet']:
-                return await interaction.response.send_message(f"**Mise insuffisante ·** Vous ne pouvez pas miser moins que le créateur du lobby, c'est-à-dire {self.roulette[interaction.channel_id]['minimal_bet']}{currency} !", ephemeral=True)
-            if user_account.balance < bet:
-                return await interaction.response.send_message(f"**Solde insuffisant ·** Vous n'avez pas {bet}{currency} sur votre compte !", ephemeral=True)
+            roulette = game['roulette'] = RussianRoulette(game['players'])
+            await channel.send(f"**Fermeture du lobby ·** La partie va bientôt commencer !")
+            await self.tell_russian_roulette(channel, roulette)
+        except asyncio.CancelledError:
+            self.refund_russian_roulette(channel.guild, game) # Module déchargé ou partie abandonnée
+            raise
+        except Exception as e:
+            logger.error(f"Erreur dans la partie de roulette russe du salon {channel.id} : {e}", exc_info=True)
+            self.refund_russian_roulette(channel.guild, game)
             try:
-                user_account.withdraw_credits(bet, 'Mise roulette russe').save()
-            except:
-                return await interaction.response.send_message(f"**Transaction impossible ·** Il y a eu un problème lors du retrait de votre mise de votre compte", ephemeral=True)
-            self.roulette[channel.id]['players'][interaction.user.id] = {'bet': bet, 'alive': True}
-            return await interaction.response.send_message(f"**Nouveau joueur ·** ***{interaction.user.name}*** a rejoint la partie avec une mise de **{bet}**{currency} !")
+                await channel.send(f"**Roulette russe interrompue ·** Une erreur est survenue, les mises ont été remboursées.")
+            except discord.HTTPException:
+                pass
+        finally:
+            self.roulette.remove(channel.id, game)
+            
+    async def tell_russian_roulette(self, channel: discord.TextChannel, game: RussianRoulette):
+        """Raconte la partie round par round, chaque round étant complété au fil des tirs dans un seul message, puis paie le gagnant"""
+        guild : discord.Guild = channel.guild
+        currency = self.bot.get_cog('Economy').guild_currency(guild)
+        members = {player_id: guild.get_member(player_id) for player_id in game.bets}
+        names = {player_id: member.name if member else 'Un joueur disparu' for player_id, member in members.items()}
         
         steps = [
             'Je vais mettre une balle dans ce revolver...',
@@ -217,76 +539,66 @@ class MiniGames(commands.GroupCog, group_name="minigame", description="Mini-jeux
             'Soyez le dernier en vie, et vous remporterez la mise.',
             'Bonne chance !'
         ]
-        msg = None
+        board = GameBoard(channel)
         for i in range(6):
             em = discord.Embed(description=f'**Préparation... ({i+1}/6) ·** *{steps[i]}*', color=0x2F3136)
-            em.set_footer(text='•' * min(i + 1, len(self.roulette[interaction.channel_id]['players'].keys())))
-            if msg:
-                await msg.edit(embed=em)
+            em.set_footer(text='•' * min(i + 1, len(game.bets)))
+            if i:
+                await board.flush(embed=em)
             else:
-                msg = await channel.send(embed=em)
+                await board.post(embed=em)
             await asyncio.sleep(2)
         
-        round = 1
-        while len([p for p in self.roulette[interaction.channel_id]['players'] if self.roulette[interaction.channel_id]['players'][p]['alive']]) > 1:
-            if round > 1:
-                round_msg = random.choice((f"***{self.bot.user.name}*** remet en ordre le révolver...", 
-                    f"***{self.bot.user.name}*** remet une balle dans le barillet...", 
-                    f"***{self.bot.user.name}*** nettoie le révolver avant de le recharger d'une balle..."))
-            else:
-                round_msg = f"***{self.bot.user.name}*** charge le révolver..."
-            await channel.send(round_msg)
-            await asyncio.sleep(1.5)
-            
-            await channel.send(f"**~~────~~ Round {round} ~~────~~**")
-            chamber = 6
-            circle = list([p for p in self.roulette[interaction.channel_id]['players'] if self.roulette[interaction.channel_id]['players'][p]['alive']])[:]
-            random.shuffle(circle)
-            circle = circle * 3
-            turn_count = 0
-            while chamber:
-                turn_count += 1
-                shot = random.randint(1, chamber) == 1 
-                player = guild.get_member(circle[0])
+        lines = []
+        for events in iter(game.play_round, []):
+            for event in events:
+                if event.type == 'round':
+                    if event.round > 1:
+                        round_msg = random.choice((f"***{self.bot.user.name}*** remet en ordre le révolver...", 
+                            f"***{self.bot.user.name}*** remet une balle dans le barillet...", 
+                            f"***{self.bot.user.name}*** nettoie le révolver avant de le recharger d'une balle..."))
+                    else:
+                        round_msg = f"***{self.bot.user.name}*** charge le révolver..."
+                    lines = [round_msg]
+                    await board.post(content=round_msg)
+                    await asyncio.sleep(1.5)
+                    self.roulette.touch(channel.id)
+                    lines.append(f"**~~────~~ Round {event.round} ~~────~~**")
+                    await board.flush(content='\n'.join(lines))
+                    continue
+                
+                if event.type == 'win':
+                    continue
+                name = names[event.player_id]
                 player_txt = random.choice(("**{}** presse le révolver à sa tempe et appuie doucement sur la détente...",
                                             "**{}** dirige le révolver vers son crâne et pose son doigt sur la détente...",
                                             "**{}** place le révolver sous sa machoire et s'apprête à appuyer sur la détente..."))
-                await channel.send(player_txt.format(player.name))
-                if shot:
+                lines.append(player_txt.format(name))
+                await board.flush(content='\n'.join(lines))
+                if event.type == 'bang':
                     await asyncio.sleep(random.uniform(3.0, 4.0))
-                    await channel.send(f"` 💥 ` **BANG ·** **{player.name}** {random.choice(['est mort.e', 'est décédé.e', 'est inanimé.e', 'a crevé.e', 'est inerte'])}")
-                    self.roulette[interaction.channel_id]['players'][player.id]['alive'] = False
+                    lines[-1] = f"` 💥 ` **BANG ·** **{name}** {random.choice(['est mort.e', 'est décédé.e', 'est inanimé.e', 'a crevé.e', 'est inerte'])}"
+                    await board.flush(content='\n'.join(lines))
                     
-                    com_player = random.choice([guild.get_member(p).name for p in self.roulette[interaction.channel_id]['players'] if self.roulette[interaction.channel_id]['players'][p]['alive']])
-                    death_time = datetime.now().strftime('%H:%M:%S')
-                    com_msg = random.choice(RUSSIAN_KILL_COM).format(player.name, com_player, death_time)
+                    com_player = names[random.choice(game.alive)]
+                    com_msg = random.choice(RUSSIAN_KILL_COM).format(name, com_player, datetime.now().strftime('%H:%M:%S'))
                     await asyncio.sleep(random.uniform(2.5, 3.5))
-                    await channel.send(com_msg)
-
-                    break
+                    lines.append(f"> {com_msg}")
+                    await board.flush(content='\n'.join(lines))
                 else:
                     await asyncio.sleep(random.uniform(2.0, 3.0))
                     rdm = random.choice(["est sauvé.e", "a survécu.e", "n'a rien eu", "est sain et sauf"])
                     emoji = random.choice(['` 🍀 `', '` 😳 `', '` 💯 `', '` 🙏 `', '` 🤞 `'])
-                    await channel.send(f"{emoji} **CLICK ·** **{player.name}** {rdm}")
-                    circle.remove(circle[0])
-                    chamber -= 1
+                    lines[-1] = f"{emoji} **CLICK ·** **{name}** {rdm}"
+                    await board.flush(content='\n'.join(lines))
                     await asyncio.sleep(2)
-            round += 1
         
         await asyncio.sleep(2)
-        endmsg = await channel.send(f"**PARTIE TERMINÉE ·** Nous avons un.e gagnant.e !")
+        await board.post(content=f"**PARTIE TERMINÉE ·** Nous avons un.e gagnant.e !")
         await asyncio.sleep(2)
-        winner = guild.get_member([p for p in self.roulette[interaction.channel_id]['players'] if self.roulette[interaction.channel_id]['players'][p]['alive']][0])
-        total_bet = sum([self.roulette[interaction.channel_id]['players'][p]['bet'] for p in self.roulette[interaction.channel_id]['players']])
-
-        winner_account = bank.get_account(winner)
-        winner_account.deposit_credits(total_bet, "Gain roulette russe").save()
-        
-        em = discord.Embed(description=f"Bravo {winner.mention}, tu es la dernière personne en vie !\nTu remportes la totalité des mises, soit **{pretty.humanize_number(total_bet)}**{currency}.", color=0x2F3136)
-        await endmsg.edit(embed=em)
-        
-        self.roulette[channel.id] = default_cache
+        winner = self.pay_russian_roulette(guild, game)
+        em = discord.Embed(description=f"Bravo {winner.mention}, tu es la dernière personne en vie !\nTu remportes la totalité des mises, soit **{pretty.humanize_number(game.pot)}**{currency}.", color=0x2F3136)
+        await board.flush(embed=em)
                 
                 
 async def setup(bot):
@@ -39,3 +39,15 @@ def get_package_path(name: str) -> str:
     :return: str
     """
     return DEFAULT_PACKAGE_PATH + name
+
+def get_data_file_path(folder_name: str, file_name: str) -> Path:
+    """Renvoie le chemin vers un fichier de données d'un module (cache, export...).
+    Le dossier est créé automatiquement s'il n'existe pas
+
+    :param folder_name: Nom du dossier de stockage
+    :param file_name: Nom du fichier
+    :return: Path
+    """
+    module_folder = Path(DEFAULT_DATA_PATH + folder_name)
+    module_folder.mkdir(parents=True, exist_ok=True)
+    return module_folder / file_name
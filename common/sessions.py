@@ -0,0 +1,81 @@
+# Registre des parties en cours, partagé par les modules de jeu
+import asyncio
+import time
+from typing import Dict, Generic, Iterator, List, Optional, TypeVar
+
+T = TypeVar('T')
+
+
+class SessionRegistry(Generic[T]):
+    """Registre des sessions de jeu actives, une seule par salon
+
+    Les sessions sans activité (voir `touch()`) depuis plus de `ttl` secondes sont considérées comme abandonnées : elles restent enregistrées
+    jusqu'à ce que `cleanup()` les retire, son appelant se chargeant de les arrêter.
+    """
+    def __init__(self, ttl: float = 3600) -> None:
+        self.ttl = ttl
+        self._sessions : Dict[int, T] = {}
+        self._last_activity : Dict[int, float] = {}
+        self._locks : Dict[int, asyncio.Lock] = {}
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def __contains__(self, channel_id: int) -> bool:
+        return channel_id in self._sessions
+
+    def __iter__(self) -> Iterator[T]:
+        return iter(list(self._sessions.values()))
+
+    def _is_expired(self, channel_id: int, now: float) -> bool:
+        return now - self._last_activity[channel_id] > self.ttl
+
+    def get(self, channel_id: int) -> Optional[T]:
+        """Renvoie la session enregistrée sur le salon, s'il y en a une"""
+        return self._sessions.get(channel_id)
+
+    def register(self, channel_id: int, session: T) -> bool:
+        """Enregistre une nouvelle session sur le salon
+
+        :param channel_id: Identifiant du salon
+        :param session: Session à enregistrer
+        :return: False si une session est déjà enregistrée sur ce salon
+        """
+        if channel_id in self:
+            return False
+        self._sessions[channel_id] = session
+        self._last_activity[channel_id] = time.time()
+        return True
+
+    def touch(self, channel_id: int) -> None:
+        """Signale une activité sur la session du salon pour repousser son expiration"""
+        if channel_id in self._sessions:
+            self._last_activity[channel_id] = time.time()
+
+    def remove(self, channel_id: int, session: Optional[T] = None) -> Optional[T]:
+        """Retire la session du salon
+
+        :param channel_id: Identifiant du salon
+        :param session: Si précisée, la session n'est retirée que si c'est bien celle enregistrée sur le salon
+        :return: La session retirée
+        """
+        if session is not None and self._sessions.get(channel_id) is not session:
+            return None
+        self._last_activity.pop(channel_id, None)
+        lock = self._locks.get(channel_id)
+        if lock and not lock.locked():
+            del self._locks[channel_id]
+        return self._sessions.pop(channel_id, None)
+
+    def lock(self, channel_id: int) -> asyncio.Lock:
+        """Verrou propre au salon, à tenir pendant les opérations asynchrones qui précèdent ou modifient une session"""
+        return self._locks.setdefault(channel_id, asyncio.Lock())
+
+    def cleanup(self) -> List[T]:
+        """Retire les sessions abandonnées
+
+        :return: Les sessions retirées
+        """
+        now = time.time()
+        expired = [channel_id for channel_id in self._sessions if self._is_expired(channel_id, now)]
+        return [session for session in (self.remove(channel_id) for channel_id in expired) if session is not None]
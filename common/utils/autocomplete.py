@@ -0,0 +1,76 @@
+# Cache des candidats proposés par les autocomplétions des commandes
+import asyncio
+import logging
+import time
+from typing import Callable, Dict, Hashable, Iterable, List, Optional, Tuple, TypeVar
+
+from common.utils.fuzzy import Finder
+
+logger = logging.getLogger('ctrlalt.Autocomplete')
+
+T = TypeVar('T')
+
+MAX_CHOICES = 25 # Limite de propositions d'une autocomplétion Discord
+
+
+class AutocompleteCache:
+    """Candidats d'autocomplétion mis en cache par portée (serveur, commande, option)
+
+    Les candidats sont chargés une fois puis filtrés à chaque frappe avec un `Finder`, qui ne réexamine que les résultats de la frappe précédente quand la recherche la prolonge.
+    Le chargement se fait hors de la boucle d'événements ; s'il dépasse `load_timeout`, la réponse est faite avec les anciens candidats (ou aucun) et le cache est mis à jour dès que le chargement se termine.
+    """
+    def __init__(self, ttl: float = 300, load_timeout: float = 2.0) -> None:
+        self.ttl = ttl
+        self.load_timeout = load_timeout
+        self._entries : Dict[Tuple[Hashable, ...], Tuple[float, Finder]] = {}
+        self._loading : Dict[Tuple[Hashable, ...], asyncio.Future] = {}
+
+    def invalidate(self, *scope: Hashable) -> None:
+        """Oublie les candidats de la portée donnée et de toutes ses sous-portées (ex. `invalidate(guild.id)` pour tout un serveur)
+
+        Les chargements en cours pour ces portées sont abandonnés : leurs résultats, antérieurs à l'invalidation, ne seront pas mis en cache."""
+        for key in [key for key in self._entries if key[:len(scope)] == scope]:
+            del self._entries[key]
+        for key in [key for key in self._loading if key[:len(scope)] == scope]:
+            del self._loading[key]
+
+    async def _load(self, scope: Tuple[Hashable, ...], loader: Callable[[], Iterable[T]], key: Optional[Callable[[T], str]]) -> Optional[Finder]:
+        task = self._loading.get(scope)
+        if task is None:
+            task = asyncio.ensure_future(asyncio.to_thread(lambda: Finder(loader(), key=key)))
+            self._loading[scope] = task
+
+            def store(done: asyncio.Future) -> None:
+                if self._loading.get(scope) is not done: # Portée invalidée pendant le chargement
+                    if not done.cancelled():
+                        done.exception()
+                    return
+                del self._loading[scope]
+                if not done.cancelled() and done.exception() is None:
+                    self._entries[scope] = (time.monotonic(), done.result())
+                elif not done.cancelled():
+                    logger.error(f"Erreur lors du chargement des candidats {scope}", exc_info=done.exception())
+            task.add_done_callback(store)
+        try:
+            return await asyncio.wait_for(asyncio.shield(task), self.load_timeout)
+        except Exception: # Chargement trop long ou en erreur : anciens candidats s'il y en a
+            entry = self._entries.get(scope)
+            return entry[1] if entry else None
+
+    async def search(self, scope: Tuple[Hashable, ...], current: str, loader: Callable[[], Iterable[T]], *, key: Optional[Callable[[T], str]] = None, limit: int = MAX_CHOICES) -> List[T]:
+        """Renvoie les candidats correspondant à la saisie en cours
+
+        :param scope: Portée du cache, par exemple (guild.id, 'bankset', 'setting')
+        :param current: Saisie en cours
+        :param loader: Fonction (synchrone) chargeant l'ensemble des candidats, appelée hors de la boucle d'événements
+        :param key: Texte à rechercher pour chaque candidat
+        :param limit: Nombre maximal de candidats renvoyés
+        """
+        entry = self._entries.get(scope)
+        if entry and time.monotonic() - entry[0] < self.ttl:
+            finder = entry[1]
+        else:
+            finder = await self._load(scope, loader, key)
+        if finder is None:
+            return []
+        return finder(current)[:limit]
@@ -0,0 +1,34 @@
+# Horloges utilisées pour cadencer les jeux
+import asyncio
+import time
+
+
+class Clock:
+    """Horloge réelle, utilisée par défaut par les jeux"""
+    def time(self) -> float:
+        return time.time()
+
+    def monotonic(self) -> float:
+        return time.monotonic()
+
+    async def sleep(self, delay: float) -> None:
+        await asyncio.sleep(delay)
+
+
+class VirtualClock(Clock):
+    """Horloge virtuelle pour les simulations : les attentes font avancer le temps sans réellement attendre
+
+    Une horloge ne doit être partagée que par des tâches qui se déroulent l'une après l'autre (une partie), sans quoi chaque attente avance le temps de toutes les autres.
+    """
+    def __init__(self, start: float = 0.0) -> None:
+        self.now = start
+
+    def time(self) -> float:
+        return self.now
+
+    def monotonic(self) -> float:
+        return self.now
+
+    async def sleep(self, delay: float) -> None:
+        self.now += max(delay, 0)
+        await asyncio.sleep(0) # Laisse tourner les autres tâches
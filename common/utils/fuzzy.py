@@ -10,36 +10,99 @@ file, You can obtain one at http://mozilla.org/MPL/2.0/.
 
 from __future__ import annotations
 
+import asyncio
+import os
 import re
 import heapq
-from typing import Callable, Iterable, Literal, Optional, Sequence, TypeVar, Generator, overload
+from collections import Counter
+from concurrent.futures import Executor
+from functools import lru_cache
+from typing import Callable, Generic, Iterable, Literal, Optional, Protocol, Sequence, TypeVar, Generator, overload
 from difflib import SequenceMatcher
 
+try:
+    import Levenshtein
+except ImportError:
+    Levenshtein = None
+
 T = TypeVar('T')
 
 
+class Backend(Protocol):
+    """Moteur de comparaison utilisé par les scorers (similarités entre 0 et 1)"""
+    name: str
+
+    def ratio(self, a: str, b: str) -> float:
+        ...
+
+    def quick_ratio(self, a: str, b: str) -> float:
+        ...
+
+    def matching_blocks(self, a: str, b: str) -> Iterable[tuple[int, int, int]]:
+        ...
+
+
+class DifflibBackend:
+    name = 'difflib'
+
+    def ratio(self, a: str, b: str) -> float:
+        return SequenceMatcher(None, a, b).ratio()
+
+    def quick_ratio(self, a: str, b: str) -> float:
+        return SequenceMatcher(None, a, b).quick_ratio()
+
+    def matching_blocks(self, a: str, b: str) -> Iterable[tuple[int, int, int]]:
+        return SequenceMatcher(None, a, b).get_matching_blocks()
+
+
+class LevenshteinBackend:
+    """Extension C `Levenshtein` (dépendance du bot), bien plus rapide que difflib"""
+    name = 'levenshtein'
+
+    def ratio(self, a: str, b: str) -> float:
+        return Levenshtein.ratio(a, b)  # type: ignore
+
+    def quick_ratio(self, a: str, b: str) -> float:
+        # Même borne que SequenceMatcher.quick_ratio : caractères communs sans tenir compte de l'ordre
+        total = len(a) + len(b)
+        if not total:
+            return 1.0
+        return 2.0 * sum((Counter(a) & Counter(b)).values()) / total
+
+    def matching_blocks(self, a: str, b: str) -> Iterable[tuple[int, int, int]]:
+        return Levenshtein.matching_blocks(Levenshtein.editops(a, b), a, b)  # type: ignore
+
+
+_backend: Backend = LevenshteinBackend() if Levenshtein is not None else DifflibBackend()
+
+
+def get_backend() -> Backend:
+    return _backend
+
+
+def set_backend(backend: Backend) -> None:
+    """Remplace le moteur de comparaison (par exemple `DifflibBackend()` pour retrouver les scores historiques)"""
+    global _backend
+    _backend = backend
+
+
 def ratio(a: str, b: str) -> int:
-    m = SequenceMatcher(None, a, b)
-    return int(round(100 * m.ratio()))
+    return int(round(100 * _backend.ratio(a, b)))
 
 
 def quick_ratio(a: str, b: str) -> int:
-    m = SequenceMatcher(None, a, b)
-    return int(round(100 * m.quick_ratio()))
+    return int(round(100 * _backend.quick_ratio(a, b)))
 
 
 def partial_ratio(a: str, b: str) -> int:
     short, long = (a, b) if len(a) <= len(b) else (b, a)
-    m = SequenceMatcher(None, short, long)
-
-    blocks = m.get_matching_blocks()
+    backend = _backend
 
     scores: list[float] = []
-    for i, j, n in blocks:
+    for i, j, n in backend.matching_blocks(short, long):
         start = max(j - i, 0)
         end = start + len(short)
-        o = SequenceMatcher(None, short, long[start:end])
-        r = o.ratio()
+        r = backend.ratio(short, long[start:end])
 
         if 100 * r > 99:
             return 100
@@ -144,11 +207,175 @@ def extract(
     score_cutoff: int = 0,
     limit: Optional[int] = 10,
 ) -> list[tuple[str, int]] | list[tuple[str, int, T]]:
-    it = _extraction_generator(query, choices, scorer, score_cutoff)
+    if limit is None:
+        return _extract(_extraction_generator(query, choices, scorer, score_cutoff), limit)
+    query, keys, values, texts, scorer = _prepare(query, choices, scorer)
+    return _results(keys, values, _top_k(query, texts, range(len(texts)), scorer, score_cutoff, limit))
+
+
+def _extract(it: Iterable, limit: Optional[int]) -> list:
     key = lambda t: t[1]
     if limit is not None:
-        return heapq.nlargest(limit, it, key=key)  # type: ignore
-    return sorted(it, key=key, reverse=True)  # type: ignore
+        return heapq.nlargest(limit, it, key=key)
+    return sorted(it, key=key, reverse=True)
+
+
+def _prepare(query: str, choices: dict[str, T] | Sequence[str], scorer: Callable[[str, str], int]) -> tuple:
+    """Sépare les clés et valeurs des choix ; les scorers token_sort sont ramenés à leur scorer de base sur les formes triées"""
+    if isinstance(choices, dict):
+        keys: Sequence[str] = list(choices.keys())
+        values: Optional[list] = list(choices.values())
+    else:
+        keys, values = choices, None
+    base = _TOKEN_SORTED.get(scorer)
+    if base is not None:
+        return _sort_tokens(query), keys, values, [_sort_tokens(key) for key in keys], base
+    return query, keys, values, keys, scorer
+
+
+def _top_k(
+    query: str,
+    texts: Sequence[str],
+    candidates: Iterable[int],
+    scorer: Callable[[str, str], int],
+    score_cutoff: int,
+    limit: int,
+) -> list[tuple[int, int]]:
+    """Les `limit` meilleurs (score, indice) parmi les candidats, dans l'ordre de `heapq.nlargest` (à score égal, le premier choix l'emporte)
+
+    Un choix n'entre dans le tas que s'il dépasse strictement le plus faible score retenu : les choix dont un majorant peu coûteux
+    (longueurs, puis quick_ratio avec difflib) n'y parvient pas ne sont pas évalués, et la recherche s'arrête dès que le tas est rempli de scores de 100.
+    """
+    if limit <= 0:
+        return []
+    length_bounded = scorer in _LENGTH_BOUNDED
+    quick_bounded = scorer is ratio and isinstance(_backend, DifflibBackend)
+    size = len(query)
+    threshold = score_cutoff - 1
+    heap: list[tuple[int, int]] = []
+    reachable: dict[int, int] = {}  # Score maximal atteignable selon la longueur du choix
+    for i in candidates:
+        text = texts[i]
+        if length_bounded:
+            n = len(text)
+            best = reachable.get(n)
+            if best is None:
+                total = size + n
+                best = reachable[n] = int(round(200 * min(size, n) / total)) if total else 100
+            if best <= threshold:
+                continue
+        if quick_bounded and quick_ratio(query, text) <= threshold:
+            continue
+        score = scorer(query, text)
+        if score <= threshold:
+            continue
+        if len(heap) < limit:
+            heapq.heappush(heap, (score, -i))
+        else:
+            heapq.heapreplace(heap, (score, -i))
+        if len(heap) == limit:
+            threshold = heap[0][0]
+            if threshold >= 100:
+                break
+    return [(score, -i) for score, i in sorted(heap, reverse=True)]
+
+
+def _results(keys: Sequence[str], values: Optional[Sequence[T]], hits: list[tuple[int, int]]) -> list:
+    if values is None:
+        return [(keys[i], score) for score, i in hits]
+    return [(keys[i], score, values[i]) for score, i in hits]
+
+
+# En deçà, les choix ne sont pas répartis en plusieurs lots (le coût de la répartition l'emporterait)
+PARALLEL_MIN_CHOICES = 20000
+
+
+def _extract_shard(
+    query: str,
+    texts: Sequence[str],
+    offset: int,
+    scorer: Callable[[str, str], int],
+    score_cutoff: int,
+    limit: Optional[int],
+) -> list[tuple[int, int]]:
+    """Lot de `extract_async()` : (score, indice dans la collection complète) des meilleurs choix du lot"""
+    query, _, _, texts, scorer = _prepare(query, texts, scorer)
+    if limit is not None:
+        return [(score, offset + i) for score, i in _top_k(query, texts, range(len(texts)), scorer, score_cutoff, limit)]
+    hits = []
+    for i, text in enumerate(texts):
+        score = scorer(query, text)
+        if score >= score_cutoff:
+            hits.append((score, offset + i))
+    return hits
+
+
+@overload
+async def extract_async(
+    query: str,
+    choices: Sequence[str],
+    *,
+    scorer: Callable[[str, str], int] = ...,
+    score_cutoff: int = ...,
+    limit: Optional[int] = ...,
+    executor: Optional[Executor] = ...,
+    shards: Optional[int] = ...,
+) -> list[tuple[str, int]]:
+    ...
+
+
+@overload
+async def extract_async(
+    query: str,
+    choices: dict[str, T],
+    *,
+    scorer: Callable[[str, str], int] = ...,
+    score_cutoff: int = ...,
+    limit: Optional[int] = ...,
+    executor: Optional[Executor] = ...,
+    shards: Optional[int] = ...,
+) -> list[tuple[str, int, T]]:
+    ...
+
+
+async def extract_async(
+    query: str,
+    choices: dict[str, T] | Sequence[str],
+    *,
+    scorer: Callable[[str, str], int] = quick_ratio,
+    score_cutoff: int = 0,
+    limit: Optional[int] = 10,
+    executor: Optional[Executor] = None,
+    shards: Optional[int] = None,
+) -> list[tuple[str, int]] | list[tuple[str, int, T]]:
+    """`extract()` hors de la boucle d'événements, pour les grandes collections (membres d'un gros serveur, bibliothèque de cartes...)
+
+    Les choix sont répartis en lots évalués dans `executor` (par défaut celui de la boucle, à base de threads) puis fusionnés ;
+    le résultat est identique à celui d'`extract()`. Les threads évitent de bloquer la boucle mais se partagent le GIL,
+    un `ProcessPoolExecutor` évalue réellement les lots en parallèle (le moteur choisi par `set_backend()` n'y est alors pas transmis).
+
+    :param executor: Exécuteur évaluant les lots
+    :param shards: Nombre de lots, par défaut un par processeur au-delà de `PARALLEL_MIN_CHOICES` choix
+    """
+    if isinstance(choices, dict):
+        keys: Sequence[str] = list(choices.keys())
+        values: Optional[list] = list(choices.values())
+    else:
+        keys, values = choices, None
+    if shards is None:
+        shards = (os.cpu_count() or 1) if len(keys) >= PARALLEL_MIN_CHOICES else 1
+    size = max(-(-len(keys) // max(shards, 1)), 1)
+
+    loop = asyncio.get_running_loop()
+    tasks = [loop.run_in_executor(executor, _extract_shard, query, keys[start:start + size], start, scorer, score_cutoff, limit)
+             for start in range(0, len(keys), size)]
+    hits = [hit for shard in await asyncio.gather(*tasks) for hit in shard]
+    hits.sort(key=lambda hit: (-hit[0], hit[1]))
+    return _results(keys, values, hits if limit is None else hits[:limit])
+
+
+def _first(matches: list) -> Optional[tuple]:
+    return matches[0] if matches else None
 
 
 @overload
@@ -180,13 +407,7 @@ def extract_one(
     scorer: Callable[[str, str], int] = quick_ratio,
     score_cutoff: int = 0,
 ) -> Optional[tuple[str, int]] | Optional[tuple[str, int, T]]:
-    it = _extraction_generator(query, choices, scorer, score_cutoff)
-    key = lambda t: t[1]
-    try:
-        return max(it, key=key)
-    except:
-        # iterator could return nothing
-        return None
+    return _first(extract(query, choices, scorer=scorer, score_cutoff=score_cutoff, limit=1))
 
 
 @overload
@@ -221,7 +442,19 @@ def extract_or_exact(
     score_cutoff: int = 0,
     limit: Optional[int] = None,
 ) -> list[tuple[str, int]] | list[tuple[str, int, T]]:
-    matches = extract(query, choices, scorer=scorer, score_cutoff=score_cutoff, limit=limit)
+    if limit is None:
+        # Les deux meilleurs suffisent à savoir si l'un des choix est exact ou nettement devant les autres
+        top = extract(query, choices, scorer=scorer, score_cutoff=score_cutoff, limit=2)
+        if _is_decisive(top):
+            return _or_exact(top)
+    return _or_exact(extract(query, choices, scorer=scorer, score_cutoff=score_cutoff, limit=limit))
+
+
+def _is_decisive(top: list) -> bool:
+    return len(top) < 2 or top[0][1] == 100 or top[0][1] > (top[1][1] + 30)
+
+
+def _or_exact(matches: list) -> list:
     if len(matches) == 0:
         return []
 
@@ -267,7 +500,10 @@ def extract_matches(
     scorer: Callable[[str, str], int] = quick_ratio,
     score_cutoff: int = 0,
 ) -> list[tuple[str, int]] | list[tuple[str, int, T]]:
-    matches = extract(query, choices, scorer=scorer, score_cutoff=score_cutoff, limit=None)
+    return _top_matches(extract(query, choices, scorer=scorer, score_cutoff=score_cutoff, limit=None))
+
+
+def _top_matches(matches: list) -> list:
     if len(matches) == 0:
         return []
 
@@ -289,6 +525,98 @@ def extract_matches(
     return to_return
 
 
+# Scorers dont le score ne peut dépasser 2 * min(la, lb) / (la + lb), ce qui permet d'écarter des choix selon leur longueur
+_LENGTH_BOUNDED = {ratio, quick_ratio, token_sort_ratio, quick_token_sort_ratio}
+# Scorers token_sort : le choix est comparé sous sa forme triée, calculée une fois pour toutes par l'index
+_TOKEN_SORTED = {token_sort_ratio: ratio, quick_token_sort_ratio: quick_ratio, partial_token_sort_ratio: partial_ratio}
+
+
+class FuzzyIndex(Generic[T]):
+    """Choix préparés une fois pour toutes en vue de recherches répétées (liste de membres, de cartes...)
+
+    Les formes triées des choix (scorers token_sort) sont pré-calculées et les choix sont rangés par longueur :
+    avec un `score_cutoff`, seuls les choix dont la longueur permet d'atteindre ce score sont évalués.
+    Les résultats sont identiques à ceux des fonctions du module appelées sur la même collection.
+    """
+
+    def __init__(self, choices: dict[str, T] | Sequence[str]) -> None:
+        if isinstance(choices, dict):
+            self._keys: list[str] = list(choices.keys())
+            self._values: Optional[list[T]] = list(choices.values())
+        else:
+            self._keys = list(choices)
+            self._values = None
+        self._sorted: list[str] = [_sort_tokens(key) for key in self._keys]
+        self._buckets: dict[bool, dict[int, list[int]]] = {False: self._bucketize(self._keys), True: self._bucketize(self._sorted)}
+
+    @staticmethod
+    def _bucketize(texts: list[str]) -> dict[int, list[int]]:
+        buckets: dict[int, list[int]] = {}
+        for i, text in enumerate(texts):
+            buckets.setdefault(len(text), []).append(i)
+        return buckets
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def _candidates(self, length: int, score_cutoff: int, tokens: bool) -> Iterable[int]:
+        """Indices des choix pouvant atteindre `score_cutoff`, dans l'ordre de la collection"""
+        bound = (score_cutoff - 0.5) / 100  # Un score arrondi à score_cutoff peut venir d'un ratio légèrement inférieur
+        if bound <= 0:
+            return range(len(self._keys))
+        if length == 0:
+            lengths = [0]
+        else:
+            low, high = length * bound / (2 - bound), length * (2 - bound) / bound
+            lengths = [n for n in self._buckets[tokens] if low <= n <= high]
+        return sorted(i for n in lengths for i in self._buckets[tokens].get(n, ()))
+
+    def _prepare(self, query: str, scorer: Callable[[str, str], int], score_cutoff: int) -> tuple:
+        base = _TOKEN_SORTED.get(scorer)
+        if base is not None:
+            query, texts, scorer = _sort_tokens(query), self._sorted, base
+        else:
+            texts = self._keys
+        if scorer in _LENGTH_BOUNDED:
+            candidates: Iterable[int] = self._candidates(len(query), score_cutoff, base is not None)
+        else:
+            candidates = range(len(self._keys))
+        return query, texts, scorer, candidates
+
+    def _generator(self, query: str, scorer: Callable[[str, str], int], score_cutoff: int) -> Generator[tuple, None, None]:
+        query, texts, scorer, candidates = self._prepare(query, scorer, score_cutoff)
+        keys, values = self._keys, self._values
+        if values is None:
+            for i in candidates:
+                score = scorer(query, texts[i])
+                if score >= score_cutoff:
+                    yield (keys[i], score)
+        else:
+            for i in candidates:
+                score = scorer(query, texts[i])
+                if score >= score_cutoff:
+                    yield (keys[i], score, values[i])
+
+    def extract(self, query: str, *, scorer: Callable[[str, str], int] = quick_ratio, score_cutoff: int = 0, limit: Optional[int] = 10) -> list:
+        if limit is None:
+            return _extract(self._generator(query, scorer, score_cutoff), limit)
+        query, texts, scorer, candidates = self._prepare(query, scorer, score_cutoff)
+        return _results(self._keys, self._values, _top_k(query, texts, candidates, scorer, score_cutoff, limit))
+
+    def extract_one(self, query: str, *, scorer: Callable[[str, str], int] = quick_ratio, score_cutoff: int = 0) -> Optional[tuple]:
+        return _first(self.extract(query, scorer=scorer, score_cutoff=score_cutoff, limit=1))
+
+    def extract_or_exact(self, query: str, *, scorer: Callable[[str, str], int] = quick_ratio, score_cutoff: int = 0, limit: Optional[int] = None) -> list:
+        if limit is None:
+            top = self.extract(query, scorer=scorer, score_cutoff=score_cutoff, limit=2)
+            if _is_decisive(top):
+                return _or_exact(top)
+        return _or_exact(self.extract(query, scorer=scorer, score_cutoff=score_cutoff, limit=limit))
+
+    def extract_matches(self, query: str, *, scorer: Callable[[str, str], int] = quick_ratio, score_cutoff: int = 0) -> list:
+        return _top_matches(self.extract(query, scorer=scorer, score_cutoff=score_cutoff, limit=None))
+
+
 @overload
 def finder(
     text: str,
@@ -329,25 +657,62 @@ def finder(
     key: Optional[Callable[[T], str]] = None,
     raw: bool = False,
 ) -> list[tuple[int, int, T]] | list[T]:
-    suggestions: list[tuple[int, int, T]] = []
-    text = str(text)
-    pat = '.*?'.join(map(re.escape, text))
-    regex = re.compile(pat, flags=re.IGNORECASE)
+    regex = _finder_pattern(str(text))
+    suggestions: list[tuple[int, int, str | T, T]] = []
     for item in collection:
         to_search = key(item) if key else str(item)
         r = regex.search(to_search)
         if r:
-            suggestions.append((len(r.group()), r.start(), item))
+            suggestions.append((r.end() - r.start(), r.start(), to_search if key else item, item))
+    return _finder_results(suggestions, raw)
 
-    def sort_key(tup: tuple[int, int, T]) -> tuple[int, int, str | T]:
-        if key:
-            return tup[0], tup[1], key(tup[2])
-        return tup
 
+@lru_cache(maxsize=512)
+def _finder_pattern(text: str) -> re.Pattern[str]:
+    return re.compile('.*?'.join(map(re.escape, text)), flags=re.IGNORECASE)
+
+
+def _finder_results(suggestions: list[tuple[int, int, str | T, T]], raw: bool) -> list:
+    suggestions.sort(key=lambda tup: tup[:3])  # type: ignore
     if raw:
-        return sorted(suggestions, key=sort_key)
-    else:
-        return [z for _, _, z in sorted(suggestions, key=sort_key)]
+        return [(length, start, item) for length, start, _, item in suggestions]
+    return [item for _, _, _, item in suggestions]
+
+
+class Finder(Generic[T]):
+    """`finder()` sur une collection fixe, pensé pour l'autocomplétion
+
+    Les textes à chercher sont extraits une seule fois. Quand la recherche prolonge la précédente (frappe suivante),
+    seuls les éléments qui correspondaient déjà sont réexaminés : une sous-séquence de la nouvelle recherche l'est aussi de l'ancienne.
+    """
+
+    def __init__(self, collection: Iterable[T], *, key: Optional[Callable[[T], str]] = None) -> None:
+        self._items: list[T] = list(collection)
+        self._texts: list[str] = [key(item) if key else str(item) for item in self._items]
+        self._keyed = key is not None
+        self._last: Optional[tuple[str, list[int]]] = None
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __call__(self, text: str, *, raw: bool = False) -> list:
+        text = str(text)
+        if self._last is not None and text.startswith(self._last[0]):
+            candidates: Iterable[int] = self._last[1]
+        else:
+            candidates = range(len(self._items))
+
+        regex = _finder_pattern(text)
+        matched: list[int] = []
+        suggestions: list[tuple[int, int, str | T, T]] = []
+        for i in candidates:
+            r = regex.search(self._texts[i])
+            if r:
+                matched.append(i)
+                item = self._items[i]
+                suggestions.append((r.end() - r.start(), r.start(), self._texts[i] if self._keyed else item, item))
+        self._last = (text, matched)
+        return _finder_results(suggestions, raw)
 
 
 def find(text: str, collection: Iterable[str], *, key: Optional[Callable[[str], str]] = None) -> Optional[str]:
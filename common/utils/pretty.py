@@ -1,5 +1,11 @@
 # Fonctions d'affichage transverses
-from typing import Union
+import unicodedata
+from functools import lru_cache
+from typing import Any, Iterable, List, Optional, Sequence, Union
+
+EMBED_DESCRIPTION_LIMIT = 4096
+
+_ZERO_WIDTH = {'\u200b', '\u200c', '\u200d', '\u2060', '\ufe0e', '\ufe0f'} | {chr(c) for c in range(0x1F3FB, 0x1F400)} # Dont les modificateurs de couleur de peau
 
 def bar_chart(value: int, max_value: int, char_value: int = 1, use_half_bar: bool = True) -> str:
     """Crée une barre en ASCII représentant une progression ou une proportion
@@ -46,3 +52,104 @@ def codeblock(text: str, lang: str = "") -> str:
     :return: str
     """
     return f"```{lang}\n{text}\n```"
+
+@lru_cache(maxsize=4096)
+def text_width(text: str) -> int:
+    """Renvoie la largeur d'affichage du texte dans un bloc de code (caractères larges et emojis comptant double)
+
+    :param text: Texte à mesurer
+    :return: int
+    """
+    if text.isascii():
+        return len(text)
+    width = last = 0
+    joined = False
+    for char in text:
+        if char == '\ufe0f' and not joined:
+            width += 1 if last == 1 else 0 # Sélecteur de variation : le caractère précédent s'affiche en emoji
+            last = 2
+            continue
+        if char in _ZERO_WIDTH or unicodedata.combining(char):
+            joined = char == '\u200d' # Les séquences d'emojis liées par ZWJ ne forment qu'un seul glyphe
+            continue
+        if joined:
+            joined = False
+            continue
+        last = 2 if unicodedata.east_asian_width(char) in 'WF' else 1
+        width += last
+    return width
+
+def _is_number(value: Any) -> bool:
+    if isinstance(value, bool):
+        return False
+    if isinstance(value, (int, float)):
+        return True
+    try:
+        float(str(value))
+    except ValueError:
+        return False
+    return True
+
+def _pad(text: str, width: int, right: bool) -> str:
+    fill = ' ' * (width - text_width(text))
+    return fill + text if right else text + fill
+
+def _table_lines(rows: List[Sequence[Any]], headers: Optional[Sequence[str]] = None) -> tuple:
+    columns = max([len(headers or ())] + [len(row) for row in rows])
+    headers = [str(h) for h in headers or ()]
+    cells = [[str(value) for value in row] + [''] * (columns - len(row)) for row in rows]
+    widths = [text_width(h) for h in headers] + [0] * (columns - len(headers))
+    right = [True] * columns
+    for row, texts in zip(rows, cells):
+        for i, text in enumerate(texts):
+            widths[i] = max(widths[i], text_width(text))
+            if right[i] and i < len(row) and not _is_number(row[i]):
+                right[i] = False
+    
+    head = []
+    if headers:
+        head.append('  '.join(_pad(h, widths[i], right[i]) for i, h in enumerate(headers + [''] * (columns - len(headers)))).rstrip())
+        head.append('  '.join('-' * w for w in widths))
+    lines = ['  '.join(_pad(text, widths[i], right[i]) for i, text in enumerate(texts)).rstrip() for texts in cells]
+    return head, lines
+
+def table(rows: Iterable[Sequence[Any]], headers: Optional[Sequence[str]] = None) -> str:
+    """Formate des lignes en tableau à largeur fixe (nombres alignés à droite), à placer dans un bloc de code
+
+    :param rows: Lignes du tableau
+    :param headers: En-têtes des colonnes, par défaut aucun
+    :return: str
+    """
+    head, lines = _table_lines(list(rows), headers)
+    return '\n'.join(head + lines)
+
+def table_pages(rows: Iterable[Sequence[Any]], headers: Optional[Sequence[str]] = None, *, lang: str = "", limit: int = EMBED_DESCRIPTION_LIMIT, max_rows: Optional[int] = None) -> List[str]:
+    """Formate des lignes en tableau découpé en pages, chacune sous forme d'un bloc de code ne dépassant pas `limit` caractères
+
+    Les colonnes ont la même largeur sur toutes les pages et les en-têtes sont répétés sur chacune.
+
+    :param rows: Lignes du tableau
+    :param headers: En-têtes des colonnes, par défaut aucun
+    :param lang: Langage du bloc de code, par défaut "" (aucun)
+    :param limit: Nombre de caractères max. d'une page, par défaut la limite d'une description d'embed
+    :param max_rows: Nombre de lignes max. d'une page, par défaut illimité
+    :return: List[str]
+    """
+    head, lines = _table_lines(list(rows), headers)
+    overhead = len(codeblock('', lang))
+    # Chaque page doit pouvoir contenir les deux lignes d'en-tête et au moins une ligne du tableau
+    width = max((limit - overhead) // 3 - 1 if head else limit - overhead - 1, 1)
+    head = [troncate_text(line, width) for line in head]
+    base = overhead + sum(len(line) + 1 for line in head)
+    pages = []
+    page, size = [], base
+    for line in lines:
+        line = troncate_text(line, width)
+        if page and (size + len(line) + 1 > limit or (max_rows and len(page) >= max_rows)):
+            pages.append(codeblock('\n'.join(head + page), lang))
+            page, size = [], base
+        page.append(line)
+        size += len(line) + 1
+    if page or not pages:
+        pages.append(codeblock('\n'.join(head + page), lang))
+    return pages
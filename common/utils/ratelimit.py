@@ -0,0 +1,107 @@
+# Outils de limitation du débit des envois vers Discord
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+from weakref import WeakValueDictionary
+
+import discord
+
+from common.utils.clock import Clock
+
+logger = logging.getLogger('ctrlalt.RateLimit')
+
+
+class SendBudget:
+    """Budget d'envois sur une fenêtre glissante (par défaut 5 envois toutes les 5 secondes, la limite d'un salon Discord)
+
+    Plutôt que de déclencher les limites de débit de l'API, `acquire()` attend qu'une place se libère dans la fenêtre.
+    """
+    _channels : 'WeakValueDictionary[int, SendBudget]' = WeakValueDictionary()
+    
+    def __init__(self, rate: int = 5, per: float = 5.0, clock: Optional[Clock] = None) -> None:
+        self.rate = rate
+        self.per = per
+        self.clock = clock or Clock()
+        self._sent : Deque[float] = deque()
+        self._lock = asyncio.Lock()
+        
+    @classmethod
+    def for_channel(cls, channel_id: int) -> 'SendBudget':
+        """Budget partagé par tous les jeux en cours sur un même salon"""
+        budget = cls._channels.get(channel_id)
+        if budget is None:
+            budget = cls._channels[channel_id] = cls()
+        return budget
+
+    def __purge(self, now: float) -> None:
+        while self._sent and now - self._sent[0] >= self.per:
+            self._sent.popleft()
+
+    async def acquire(self) -> None:
+        """Attend qu'un envoi soit possible et le comptabilise"""
+        async with self._lock:
+            now = self.clock.monotonic()
+            self.__purge(now)
+            if len(self._sent) >= self.rate:
+                await self.clock.sleep(self.per - (now - self._sent[0]))
+                self._sent.popleft()
+            self._sent.append(self.clock.monotonic())
+
+
+class GameBoard:
+    """Message « tableau de jeu » mis à jour par éditions plutôt que par de nouveaux messages
+
+    Les modifications demandées avec `update()` sont regroupées et appliquées au plus une fois par `interval` secondes, `flush()` les applique immédiatement.
+    Tous les envois et éditions passent par le budget du salon.
+    """
+    def __init__(self, channel: discord.abc.Messageable, budget: Optional[SendBudget] = None, interval: float = 2.0) -> None:
+        self.channel = channel
+        self.budget = budget or SendBudget.for_channel(channel.id) #type: ignore
+        self.interval = interval
+        self.message : Optional[discord.Message] = None
+        self._pending : Dict[str, Any] = {}
+        self._task : Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+        
+    def attach(self, message: discord.Message) -> None:
+        """Fait d'un message existant le tableau de jeu"""
+        self.close()
+        self.message = message
+        
+    async def post(self, **kwargs) -> discord.Message:
+        """Envoie un nouveau message qui devient le tableau de jeu"""
+        self.close()
+        await self.budget.acquire()
+        self.message = await self.channel.send(**kwargs)
+        return self.message
+    
+    def update(self, **kwargs) -> None:
+        """Programme une modification du tableau, regroupée avec celles qui suivent"""
+        self._pending.update(kwargs)
+        if not self._task or self._task.done():
+            self._task = asyncio.create_task(self.__delayed_flush())
+            
+    async def __delayed_flush(self) -> None:
+        await self.budget.clock.sleep(self.interval)
+        try:
+            await self.flush()
+        except discord.HTTPException as e:
+            logger.warning(f"Modifications du tableau de jeu {getattr(self.message, 'id', None)} perdues : {e}")
+    
+    async def flush(self, **kwargs) -> Optional[discord.Message]:
+        """Applique immédiatement les modifications en attente (et celles données)"""
+        self._pending.update(kwargs)
+        async with self._lock:
+            changes, self._pending = self._pending, {}
+            if changes and self.message:
+                await self.budget.acquire()
+                self.message = await self.message.edit(**changes)
+        return self.message
+    
+    def close(self) -> None:
+        """Abandonne les modifications en attente"""
+        if self._task and not self._task.done() and self._task is not asyncio.current_task():
+            self._task.cancel()
+        self._task = None
+        self._pending = {}
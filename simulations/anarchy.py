@@ -0,0 +1,183 @@
+# Simulation hors ligne de parties d'Anarchy entre CPU
+#
+# Usage (depuis la racine du projet) :
+#   python -m simulations.anarchy --games 1000 --concurrency 50 --rounds 5 --players 4 [--no-checkpoint]
+#
+# Les parties sont jouées par le vrai moteur (ClassicGame, CPUBrain, sauvegardes...) dans des salons factices,
+# cadencées par une horloge virtuelle : les délais d'affichage ne sont pas réellement attendus.
+# Par défaut les données (entraînement, sauvegardes) sont écrites dans un dossier temporaire.
+import argparse
+import asyncio
+import itertools
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+os.chdir(ROOT) # Les packs de cartes sont chargés depuis un chemin relatif
+
+from common import dataio
+from common.utils.clock import VirtualClock
+from cogs.anarchy import MAX_PLAYERS, PACING_PROFILES, Anarchy, BotPlayer, ClassicGame
+
+_ids = itertools.count(1)
+
+
+class SimulatedMessage:
+    """Message factice conservant le dernier contenu envoyé"""
+    def __init__(self, channel: 'SimulatedChannel', **kwargs) -> None:
+        self.id = next(_ids)
+        self.channel = channel
+        self.content = kwargs.get('content')
+        self.embed = kwargs.get('embed')
+        self.attachments = []
+
+    async def edit(self, **kwargs) -> 'SimulatedMessage':
+        self.channel.edits += 1
+        self.content = kwargs.get('content', self.content)
+        self.embed = kwargs.get('embed', self.embed)
+        return self
+
+    async def delete(self) -> None:
+        pass
+
+
+class SimulatedChannel:
+    """Salon factice comptant les appels qui auraient été faits à l'API"""
+    def __init__(self, guild: 'SimulatedGuild') -> None:
+        self.id = next(_ids)
+        self.guild = guild
+        self.sends = 0
+        self.edits = 0
+        self.messages : Dict[int, SimulatedMessage] = {}
+        guild.channels[self.id] = self
+
+    async def send(self, content: Optional[str] = None, **kwargs) -> SimulatedMessage:
+        self.sends += 1
+        message = SimulatedMessage(self, content=content, **kwargs)
+        self.messages[message.id] = message
+        return message
+
+    async def fetch_message(self, message_id: int) -> SimulatedMessage:
+        return self.messages[message_id]
+
+
+class SimulatedMember:
+    def __init__(self, member_id: int, name: str) -> None:
+        self.id = member_id
+        self.name = name
+
+    def __str__(self) -> str:
+        return self.name
+
+
+class SimulatedGuild:
+    def __init__(self) -> None:
+        self.id = next(_ids)
+        self.name = 'Simulation'
+        self.me = SimulatedMember(next(_ids), 'Bot')
+        self.channels : Dict[int, SimulatedChannel] = {}
+
+    def get_member(self, member_id: int) -> Optional[SimulatedMember]:
+        return self.me if member_id == self.me.id else None
+
+    def get_channel_or_thread(self, channel_id: int) -> Optional[SimulatedChannel]:
+        return self.channels.get(channel_id)
+
+
+class SimulatedBot:
+    """Ce dont le module Anarchy a besoin du bot"""
+    def __init__(self, guild: SimulatedGuild) -> None:
+        self.guilds = [guild]
+
+    def is_ready(self) -> bool:
+        return False
+
+    def get_guild(self, guild_id: int) -> Optional[SimulatedGuild]:
+        return next((guild for guild in self.guilds if guild.id == guild_id), None)
+
+    def add_view(self, view, message_id: Optional[int] = None) -> None:
+        pass
+
+
+async def play_game(cog: Anarchy, guild: SimulatedGuild, args: argparse.Namespace, seed: Optional[int]) -> dict:
+    """Joue une partie complète entre CPU et renvoie ses statistiques"""
+    channel = SimulatedChannel(guild)
+    clock = VirtualClock()
+    game = ClassicGame(cog, channel, args.rounds, guild.me, large=args.players > MAX_PLAYERS, seed=seed, clock=clock, headless=True, pacing=args.pacing) #type: ignore
+    game.persistent = not args.no_checkpoint
+    game._load_cards(cog.Packs)
+    for i in range(args.players):
+        game.add_player(BotPlayer(cog, f'CPU {i + 1}'))
+    cog.sessions.register(channel.id, game)
+
+    start = time.perf_counter()
+    await cog.run_session(game)
+    return {
+        'completed': game.round == args.rounds and game.phase == 'new_round',
+        'rounds': game.round,
+        'wall': time.perf_counter() - start,
+        'virtual': clock.now,
+        'sends': channel.sends,
+        'edits': channel.edits,
+        'top_score': max(player.score for player in game.players)
+    }
+
+
+async def simulate(args: argparse.Namespace) -> List[dict]:
+    guild = SimulatedGuild()
+    cog = Anarchy(SimulatedBot(guild)) #type: ignore
+    await cog.cog_load()
+    await cog.on_ready()
+
+    semaphore = asyncio.Semaphore(args.concurrency)
+    async def run(index: int) -> dict:
+        async with semaphore:
+            return await play_game(cog, guild, args, None if args.seed is None else args.seed + index)
+    try:
+        return await asyncio.gather(*(run(i) for i in range(args.games)))
+    finally:
+        await cog.cog_unload()
+
+
+def report(results: List[dict], elapsed: float) -> None:
+    completed = [r for r in results if r['completed']]
+    rounds = sum(r['rounds'] for r in results)
+    walls = sorted(r['wall'] for r in results)
+    print(f"Parties terminées : {len(completed)}/{len(results)} en {elapsed:.2f}s")
+    print(f"Débit : {len(results) / elapsed:.1f} parties/s · {rounds / elapsed:.1f} rounds/s")
+    print(f"Durée d'une partie : médiane {statistics.median(walls) * 1000:.1f}ms · p95 {walls[int(len(walls) * 0.95) - 1 if len(walls) > 1 else 0] * 1000:.1f}ms (réel) · {statistics.mean(r['virtual'] for r in results):.0f}s (virtuel)")
+    print(f"Appels API par partie : {statistics.mean(r['sends'] for r in results):.1f} envois · {statistics.mean(r['edits'] for r in results):.1f} éditions")
+    print(f"Score du gagnant : moyenne {statistics.mean(r['top_score'] for r in results):.1f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Simulation de parties d'Anarchy entre CPU")
+    parser.add_argument('--games', type=int, default=100, help="Nombre de parties à jouer")
+    parser.add_argument('--concurrency', type=int, default=10, help="Nombre de parties jouées en même temps")
+    parser.add_argument('--rounds', type=int, default=5, help="Nombre de rounds par partie")
+    parser.add_argument('--players', type=int, default=4, help="Nombre de CPU par partie")
+    parser.add_argument('--pacing', choices=list(PACING_PROFILES), default='classic', help="Rythme des parties")
+    parser.add_argument('--seed', type=int, default=None, help="Graine des paquets de cartes (partie n : graine + n)")
+    parser.add_argument('--no-checkpoint', action='store_true', help="Ne pas sauvegarder l'état des parties à chaque phase")
+    parser.add_argument('--data', action='store_true', help="Utiliser les vraies données du bot (l'entraînement des CPU sera modifié)")
+    parser.add_argument('--verbose', action='store_true')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING, format="[%(asctime)s] %(levelname)s (%(name)s) %(message)s")
+    with tempfile.TemporaryDirectory() as tmp:
+        if not args.data:
+            dataio.DEFAULT_DATA_PATH = f'{tmp}/'
+        start = time.perf_counter()
+        results = asyncio.run(simulate(args))
+        report(results, time.perf_counter() - start)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,245 @@
+# Simulation Monte-Carlo de l'économie d'un serveur (allocations et mini-jeux)
+#
+# Usage (depuis la racine du projet) :
+#   python -m simulations.economy --players 200 --weeks 4 [--seed 1] [--slot-paytable '{"🍀": [4, 0]}']
+#
+# Une population de joueurs synthétiques utilise chaque jour /daily, /minigame slot et /minigame russian
+# au travers des vraies méthodes des modules Economy et MiniGames, sur une base SQLite locale.
+# Les données sont écrites dans un dossier temporaire, sauf avec --data.
+import argparse
+import itertools
+import json
+import logging
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+os.chdir(ROOT)
+
+import cogs.economy
+import cogs.minigames
+from cogs.economy import Economy
+from cogs.minigames import ROULETTE_MAX_PLAYERS, MiniGames, RussianRoulette
+from common import dataio
+from common.utils import pretty
+
+_ids = itertools.count(1)
+
+
+class Profile(NamedTuple):
+    """Comportement d'un type de joueur"""
+    share: float # Part de la population
+    daily: float # Probabilité de demander son allocation chaque jour
+    spins: float # Nombre moyen de tours de machine à sous par jour
+    bet: int # Mise maximale à la machine à sous
+    roulette: float # Probabilité de rejoindre une partie de roulette russe ouverte
+
+
+PROFILES = {
+    'assidu': Profile(0.4, 0.9, 2, 30, 0.2),
+    'joueur': Profile(0.2, 0.7, 10, 100, 0.6),
+    'occasionnel': Profile(0.4, 0.3, 0.5, 50, 0.05)
+}
+ROULETTE_GAMES_PER_DAY = 3
+ROULETTE_BETS = (20, 100)
+
+
+class SimulatedMember:
+    def __init__(self, guild: 'SimulatedGuild', name: str, profile: str) -> None:
+        self.id = next(_ids)
+        self.guild = guild
+        self.name = name
+        self.profile = profile
+
+    def __str__(self) -> str:
+        return self.name
+
+
+class SimulatedGuild:
+    def __init__(self) -> None:
+        self.id = next(_ids)
+        self.name = 'Simulation'
+        self.members : Dict[int, SimulatedMember] = {}
+
+    def get_member(self, member_id: int) -> Optional[SimulatedMember]:
+        return self.members.get(member_id)
+
+
+class SimulatedTree:
+    def add_command(self, command, **kwargs) -> None:
+        pass
+
+
+class SimulatedBot:
+    """Ce dont les modules Economy et MiniGames ont besoin du bot"""
+    def __init__(self, guild: SimulatedGuild) -> None:
+        self.guilds = [guild]
+        self.tree = SimulatedTree()
+        self.cogs = {}
+
+    def get_cog(self, name: str):
+        return self.cogs.get(name)
+
+
+class QueryCounter:
+    """Compte les requêtes exécutées sur les bases ouvertes par les modules"""
+    def __init__(self) -> None:
+        self.queries = 0
+
+    def connect(self, folder_name: str, db_name: str = 'global') -> sqlite3.Connection:
+        conn = dataio.get_sqlite_database(folder_name, db_name)
+        conn.set_trace_callback(self._trace)
+        return conn
+
+    def _trace(self, statement: str) -> None:
+        self.queries += 1
+
+
+def gini(values: List[int]) -> float:
+    """Coefficient de Gini des soldes (0 : égalité parfaite, 1 : tout pour un seul membre)"""
+    values = sorted(values)
+    total = sum(values)
+    if not values or not total:
+        return 0.0
+    weighted = sum((i + 1) * v for i, v in enumerate(values))
+    return 2 * weighted / (len(values) * total) - (len(values) + 1) / len(values)
+
+
+def play_roulette(bank: Economy, games: MiniGames, rng: np.random.Generator, members: List[SimulatedMember]) -> int:
+    """Joue une partie de roulette russe (mises prélevées comme par /minigame russian, partie jouée par le moteur du module) et renvoie le total misé"""
+    bet = int(rng.integers(ROULETTE_BETS[0], ROULETTE_BETS[1] + 1))
+    host = members[int(rng.integers(len(members)))]
+    if bank.get_account(host).balance < bet:
+        return 0
+    players = {host.id: bet}
+    for member in rng.permutation(members): #type: ignore
+        if len(players) >= ROULETTE_MAX_PLAYERS:
+            break
+        if member.id in players or rng.random() >= PROFILES[member.profile].roulette:
+            continue
+        stake = int(rng.integers(bet, ROULETTE_BETS[1] + 1))
+        if bank.get_account(member).balance >= stake:
+            players[member.id] = stake
+    if len(players) < 2:
+        return 0
+    for member_id, stake in players.items():
+        bank.get_account(host.guild.get_member(member_id)).withdraw_credits(stake, 'Mise roulette russe').save()
+    game = RussianRoulette(players, rng=random.Random(int(rng.integers(2 ** 32))))
+    for _ in game.play():
+        pass
+    games.pay_russian_roulette(host.guild, game) #type: ignore
+    return game.pot
+
+
+def simulate_day(bank: Economy, games: MiniGames, rng: np.random.Generator, members: List[SimulatedMember], day: str) -> dict:
+    stats = {'allowances': 0, 'spins': 0, 'slot_net': 0, 'roulette': 0}
+    for member in members:
+        profile = PROFILES[member.profile]
+        if rng.random() < profile.daily:
+            status, amount = bank.claim_daily_allowance(member, day) #type: ignore
+            if status == 'paid':
+                stats['allowances'] += amount
+        for _ in range(rng.poisson(profile.spins)):
+            balance = bank.get_account(member).balance
+            bet = min(int(rng.integers(1, profile.bet + 1)), balance)
+            if bet <= 0:
+                break
+            _, credits, _ = games.spin_slot_machine(member, bet) #type: ignore
+            stats['spins'] += 1
+            stats['slot_net'] += credits or -bet
+    for _ in range(ROULETTE_GAMES_PER_DAY):
+        stats['roulette'] += play_roulette(bank, games, rng, members)
+    return stats
+
+
+def simulate(args: argparse.Namespace, counter: QueryCounter) -> List[dict]:
+    guild = SimulatedGuild()
+    bot = SimulatedBot(guild)
+    bank = Economy(bot) #type: ignore
+    games = MiniGames(bot) #type: ignore
+    bot.cogs.update({'Economy': bank, 'MiniGames': games})
+    bank._initialize_database()
+    games._initialize_database()
+    if args.seed is not None:
+        games.rng = np.random.default_rng(args.seed)
+    if args.slot_strip or args.slot_paytable:
+        update = {}
+        if args.slot_strip:
+            update['slotStrip'] = json.loads(args.slot_strip)
+        if args.slot_paytable:
+            update['slotPaytable'] = json.loads(args.slot_paytable)
+        games.set_guild_settings(guild, update) #type: ignore
+
+    rng = np.random.default_rng(None if args.seed is None else args.seed + 1)
+    names = list(PROFILES)
+    shares = np.array([PROFILES[name].share for name in names])
+    for i, profile in enumerate(rng.choice(names, size=args.players, p=shares / shares.sum())):
+        member = SimulatedMember(guild, f'Joueur {i + 1}', str(profile))
+        guild.members[member.id] = member
+    members = list(guild.members.values())
+    for member in members:
+        bank.get_account(member) #type: ignore
+
+    machine = games.get_slot_machine(guild) #type: ignore
+    logging.info(f"Machine à sous : redistribution estimée {machine.simulate(50, 1000000, seed=args.seed).rtp:.1%} (mise de 50)")
+
+    weeks = []
+    start = date(2023, 1, 2)
+    for week in range(args.weeks):
+        totals = {'allowances': 0, 'spins': 0, 'slot_net': 0, 'roulette': 0}
+        queries, clock = counter.queries, time.perf_counter()
+        for day in range(7):
+            today = (start + timedelta(days=week * 7 + day)).strftime('%d/%m/%Y')
+            for key, value in simulate_day(bank, games, rng, members, today).items():
+                totals[key] += value
+        elapsed = time.perf_counter() - clock
+        balances = list(bank.get_raw_accounts(guild).values()) #type: ignore
+        weeks.append(dict(totals, week=week + 1, supply=sum(balances), median=statistics.median(balances), gini=gini(balances),
+                          queries=counter.queries - queries, elapsed=elapsed))
+    return weeks
+
+
+def report(weeks: List[dict], initial_supply: int) -> None:
+    rows = [(w['week'], w['supply'], f"{w['supply'] - (weeks[i - 1]['supply'] if i else initial_supply):+}", int(w['median']), f"{w['gini']:.3f}",
+             w['allowances'], f"{w['slot_net']:+}", w['roulette'], int(w['queries'] / w['elapsed'])) for i, w in enumerate(weeks)]
+    print(pretty.table(rows, headers=('Semaine', 'Masse', 'Variation', 'Médiane', 'Gini', 'Allocations', 'Slots (joueurs)', 'Roulette (misé)', 'Requêtes/s')))
+    queries = sum(w['queries'] for w in weeks)
+    elapsed = sum(w['elapsed'] for w in weeks)
+    print(f"\n{queries} requêtes SQLite en {elapsed:.2f}s ({queries / elapsed:.0f}/s) · {sum(w['spins'] for w in weeks)} tours de machine à sous")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Simulation Monte-Carlo de l'économie d'un serveur")
+    parser.add_argument('--players', type=int, default=100, help="Nombre de membres du serveur simulé")
+    parser.add_argument('--weeks', type=int, default=4, help="Nombre de semaines simulées")
+    parser.add_argument('--seed', type=int, default=None, help="Graine des tirages")
+    parser.add_argument('--slot-strip', default=None, help="Bande des rouleaux de la machine à sous (JSON)")
+    parser.add_argument('--slot-paytable', default=None, help="Table des gains de la machine à sous (JSON)")
+    parser.add_argument('--data', action='store_true', help="Écrire dans les vraies données du bot")
+    parser.add_argument('--verbose', action='store_true')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING, format="[%(asctime)s] %(levelname)s (%(name)s) %(message)s")
+    counter = QueryCounter()
+    cogs.economy.get_sqlite_database = counter.connect
+    cogs.minigames.get_sqlite_database = counter.connect
+    with tempfile.TemporaryDirectory() as tmp:
+        if not args.data:
+            dataio.DEFAULT_DATA_PATH = f'{tmp}/'
+        weeks = simulate(args, counter)
+        report(weeks, args.players * int(dict(cogs.economy.DEFAULT_SETTINGS)['defaultBalance']))
+
+
+if __name__ == '__main__':
+    main()